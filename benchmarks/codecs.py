@@ -0,0 +1,54 @@
+"""Compare load/dump throughput of the `printed.path` codecs on a synthetic `Print`.
+
+Run with `python benchmarks/codecs.py [-n ITERATIONS]`.
+"""
+
+import argparse
+import timeit
+
+from whenever import TimeDelta
+
+from printed.path import codecs, type_adapter
+from printed.schema import Link, Print, PrintHistory, PrintMaterial
+
+
+def synthetic_print() -> Print:
+    return Print(
+        name="benchy",
+        title="Benchy",
+        reference_cost=12.5,
+        duration=TimeDelta(hours=1, minutes=32),
+        source_links=[Link(url=f"https://example.com/{i}") for i in range(3)],
+        materials=[PrintMaterial(material="PLA", unit_count=35.0, price_per_unit=0.02)],
+        history=[PrintHistory() for _ in range(20)],
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("-n", "--iterations", type=int, default=1000)
+    args = parser.parse_args()
+
+    adapter = type_adapter(Print)
+    print_ = synthetic_print()
+    data = adapter.dump_python(print_, mode="json")
+
+    print(f"{'codec':<10} {'load/s':>10} {'dump/s':>10}")
+    for name, codec in codecs.items():
+        content = codec.dumps(data)
+
+        load = timeit.timeit(
+            lambda: adapter.validate_python(codec.loads(content)),
+            number=args.iterations,
+        )
+        dump = timeit.timeit(
+            lambda: codec.dumps(adapter.dump_python(print_, mode="json")),
+            number=args.iterations,
+        )
+        print(
+            f"{name:<10} {args.iterations / load:>10.0f} {args.iterations / dump:>10.0f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
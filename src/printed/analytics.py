@@ -0,0 +1,212 @@
+from __future__ import annotations
+
+import logging
+import multiprocessing
+import os
+from collections.abc import Iterable
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from pathlib import Path
+from typing import ClassVar
+
+from pydantic import Field, ValidationError
+from pydantic.dataclasses import dataclass
+
+from printed.path import atomic_write, file_hash, type_adapter
+
+log = logging.getLogger(__name__)
+
+Vector = tuple[float, float, float]
+
+
+@dataclass
+class MeshStats:
+    triangles: int
+    bounds: tuple[Vector, Vector]
+    area: float
+    volume: float
+
+    @property
+    def dimensions(self) -> Vector:
+        lower, upper = self.bounds
+        return (upper[0] - lower[0], upper[1] - lower[1], upper[2] - lower[2])
+
+    def grams(self, density: float) -> float:
+        # Model units are millimeters, and densities are g/cm^3.
+        return self.volume / 1000 * density
+
+
+@dataclass
+class MeshFile:
+    mtime_ns: int
+    size: int
+    hash: str
+
+    def matches(self, stat: os.stat_result) -> bool:
+        return self.mtime_ns == stat.st_mtime_ns and self.size == stat.st_size
+
+
+def measure(path: Path) -> MeshStats:
+    from printed.mesh import load_mesh
+
+    mesh = load_mesh(path)
+    lower, upper = mesh.bounds.tolist()
+    return MeshStats(
+        triangles=len(mesh.faces),
+        bounds=(tuple(lower), tuple(upper)),
+        area=float(mesh.area),
+        # Volume is only meaningful for closed meshes, but an open mesh's
+        # (absolute) volume is still a fair estimate.
+        volume=abs(float(mesh.volume)),
+    )
+
+
+@dataclass
+class MeshIndex:
+    """Mesh statistics of model files, keyed by content hash.
+
+    Files are mapped (by path relative to the library root) to their hash, by
+    `mtime`/`size`, so that looking up a file's statistics never reads it.
+    Content which could not be measured is recorded as `failed`, so that it is
+    not retried until the file changes.
+    """
+
+    version: int = 1
+    files: dict[str, MeshFile] = Field(default_factory=dict)
+    stats: dict[str, MeshStats] = Field(default_factory=dict)
+    failed: set[str] = Field(default_factory=set)
+
+    stale: bool = Field(default=False, exclude=True)
+    # The indexed files of each print, by name; built as needed.
+    by_print: dict[str, list[str]] | None = Field(default=None, exclude=True)
+
+    VERSION: ClassVar[int] = 1
+
+    @classmethod
+    def load(cls, path: Path) -> MeshIndex:
+        try:
+            content = path.read_bytes()
+        except FileNotFoundError:
+            return cls()
+
+        try:
+            index = type_adapter(cls).validate_json(content)
+        except ValidationError:
+            log.info("Discarding unreadable mesh index: %s", path)
+            return cls(stale=True)
+
+        if index.version != cls.VERSION:
+            return cls(stale=True)
+        return index
+
+    def get(self, root: Path, file: Path) -> MeshStats | None:
+        ref = self.files.get(file.relative_to(root).as_posix())
+        if ref is None:
+            return None
+
+        try:
+            stat = file.stat()
+        except FileNotFoundError:
+            return None
+
+        if not ref.matches(stat):
+            return None
+        return self.stats.get(ref.hash)
+
+    def known(self, root: Path, file: Path) -> bool:
+        """Whether the file has been measured (or failed to be) since it last changed."""
+        ref = self.files.get(file.relative_to(root).as_posix())
+        if ref is None or (ref.hash not in self.stats and ref.hash not in self.failed):
+            return False
+
+        try:
+            return ref.matches(file.stat())
+        except FileNotFoundError:
+            return False
+
+    def models(self, name: str) -> list[str]:
+        """List the filenames of a print's indexed model files, without listing its directory."""
+        by_print = self.by_print
+        if by_print is None:
+            by_print = {}
+            for path in sorted(self.files):
+                print, _, filename = path.partition("/")
+                by_print.setdefault(print, []).append(filename)
+            self.by_print = by_print
+        return by_print.get(name, [])
+
+    def print_stats(self, name: str) -> list[MeshStats | None]:
+        """Look up the statistics of each of a print's indexed model files, as last analyzed."""
+        return [
+            self.stats.get(self.files[f"{name}/{filename}"].hash)
+            for filename in self.models(name)
+        ]
+
+    def analyze(
+        self, root: Path, files: Iterable[Path], workers: int | None = None
+    ) -> int:
+        """Measure every file not already in the index, returning the number measured."""
+        pending = [file for file in files if not self.known(root, file)]
+        if not pending:
+            return 0
+
+        # Hashing is I/O bound, so threads suffice; it lets files with already
+        # known content (e.g. copies) skip loading the mesh entirely.
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            stats = list(executor.map(os.stat, pending))
+            hashes = list(executor.map(file_hash, pending))
+
+        unknown: dict[str, Path] = {}
+        for file, stat, hash in zip(pending, stats, hashes):
+            self.files[file.relative_to(root).as_posix()] = MeshFile(
+                mtime_ns=stat.st_mtime_ns, size=stat.st_size, hash=hash
+            )
+            if hash not in self.stats and hash not in self.failed:
+                unknown.setdefault(hash, file)
+        self.stale = True
+        self.by_print = None
+
+        if unknown:
+            with ProcessPoolExecutor(
+                max_workers=workers,
+                mp_context=multiprocessing.get_context("spawn"),
+            ) as executor:
+                futures = {
+                    hash: executor.submit(measure, file)
+                    for hash, file in unknown.items()
+                }
+                for hash, future in futures.items():
+                    try:
+                        self.stats[hash] = future.result()
+                    except BrokenProcessPool:
+                        # Not the file's fault, so it is retried by the next run.
+                        log.warning(
+                            "Unable to measure %s", unknown[hash], exc_info=True
+                        )
+                    except Exception:
+                        log.warning(
+                            "Unable to measure %s", unknown[hash], exc_info=True
+                        )
+                        self.failed.add(hash)
+
+        return len(pending)
+
+    def prune(self, root: Path, files: Iterable[Path]):
+        names = {file.relative_to(root).as_posix() for file in files}
+        for name in set(self.files) - names:
+            del self.files[name]
+            self.stale = True
+            self.by_print = None
+
+        hashes = {ref.hash for ref in self.files.values()}
+        for hash in set(self.stats) - hashes:
+            del self.stats[hash]
+            self.stale = True
+        if self.failed - hashes:
+            self.failed &= hashes
+            self.stale = True
+
+    def write(self, path: Path):
+        path.parent.mkdir(parents=True, exist_ok=True)
+        atomic_write(path, type_adapter(MeshIndex).dump_json(self))
+        self.stale = False
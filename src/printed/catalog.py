@@ -0,0 +1,90 @@
+from __future__ import annotations
+
+import json
+import logging
+import os
+from pathlib import Path
+from typing import Any, ClassVar
+
+from pydantic import Field, ValidationError
+from pydantic.dataclasses import dataclass
+
+from printed.options import FsyncPolicy
+from printed.path import atomic_write, type_adapter
+
+log = logging.getLogger(__name__)
+
+
+@dataclass
+class CatalogEntry:
+    mtime_ns: int
+    size: int
+    # Kept as (compact) json text, which takes a fraction of the memory of the
+    # equivalent dicts, and is only decoded for the entries actually used.
+    data: str
+
+    def matches(self, stat: os.stat_result) -> bool:
+        return self.mtime_ns == stat.st_mtime_ns and self.size == stat.st_size
+
+
+@dataclass
+class Catalog:
+    """A snapshot of already-validated print data, keyed by print name.
+
+    Each entry records the `mtime`/`size` of the `project.toml` it was produced
+    from, so that only entries whose source file has since changed need to be
+    re-parsed.
+    """
+
+    version: int = 2
+    entries: dict[str, CatalogEntry] = Field(default_factory=dict)
+
+    stale: bool = Field(default=False, exclude=True)
+
+    VERSION: ClassVar[int] = 2
+
+    @classmethod
+    def load(cls, path: Path) -> Catalog:
+        try:
+            content = path.read_bytes()
+        except FileNotFoundError:
+            return cls()
+
+        try:
+            catalog = type_adapter(cls).validate_json(content)
+        except ValidationError:
+            log.info("Discarding unreadable catalog: %s", path)
+            return cls(stale=True)
+
+        if catalog.version != cls.VERSION:
+            return cls(stale=True)
+        return catalog
+
+    def fresh(self, name: str, stat: os.stat_result) -> bool:
+        entry = self.entries.get(name)
+        return entry is not None and entry.matches(stat)
+
+    def get(self, name: str, stat: os.stat_result) -> dict[str, Any] | None:
+        if not self.fresh(name, stat):
+            return None
+        return json.loads(self.entries[name].data)
+
+    def record(self, name: str, stat: os.stat_result, data: dict[str, Any]):
+        self.entries[name] = CatalogEntry(
+            mtime_ns=stat.st_mtime_ns,
+            size=stat.st_size,
+            data=json.dumps(data, separators=(",", ":")),
+        )
+        self.stale = True
+
+    def discard(self, name: str):
+        if self.entries.pop(name, None) is not None:
+            self.stale = True
+
+    def prune(self, names: set[str]):
+        for name in set(self.entries) - names:
+            self.discard(name)
+
+    def write(self, path: Path, fsync: FsyncPolicy = "none"):
+        atomic_write(path, type_adapter(Catalog).dump_json(self), fsync=fsync)
+        self.stale = False
@@ -7,13 +7,12 @@ from typing import Annotated
 
 import cappa
 from cappa.help import HelpFormatter
-from dotenv import load_dotenv
 from typing_extensions import Doc
 from whenever import TimeDelta
 
 from printed.console import Console
 from printed.formatting import parse_duration
-from printed.schema import State
+from printed.options import Backend, FsyncPolicy
 
 
 def console(command: Printed):
@@ -26,14 +25,32 @@ def console(command: Printed):
 
 
 def state(command: Printed):
-    return State.collect(command.path, read_materials=True)
+    from printed.schema import State
+
+    state = State.collect(
+        command.path,
+        read_materials=True,
+        backend=command.backend,
+        fsync=command.fsync,
+        scan=False,
+    )
+    try:
+        yield state
+    finally:
+        state.flush()
+
+    if state.prints.rejected:
+        rejected = ", ".join(state.prints.rejected)
+        raise cappa.Exit(
+            f"Not written, having been changed elsewhere: {rejected}.", code=1
+        )
 
 
 @dataclass
 class Printed:
     """A tool for tracking 3d print history."""
 
-    command: cappa.Subcommands[Print | Material | Web | None] = None
+    command: cappa.Subcommands[Print | Material | Storage | Web | None] = None
 
     path: Annotated[
         Path,
@@ -46,6 +63,19 @@ class Printed:
         Doc("Increase verbosity."),
     ] = 0
     tty: Annotated[bool | None, cappa.Arg(long="--tty/--no-tty")] = None
+    backend: Annotated[
+        Backend,
+        cappa.Arg(long=True, default=cappa.Env("PRINTED_BACKEND")),
+        Doc("The storage backend from which prints are read and written."),
+    ] = "toml"
+    fsync: Annotated[
+        FsyncPolicy,
+        cappa.Arg(long=True, default=cappa.Env("PRINTED_FSYNC")),
+        Doc(
+            "Whether written files are flushed to disk: not at all ('none'), "
+            "their content ('file'), or also their directory entry ('full')."
+        ),
+    ] = "file"
 
     def __call__(self):
         help_formatter = HelpFormatter()
@@ -54,7 +84,9 @@ class Printed:
 
 @dataclass
 class Print:
-    command: cappa.Subcommands[PrintAdd | PrintRemove | PrintList | PrintPrint]
+    command: cappa.Subcommands[
+        PrintAdd | PrintRemove | PrintList | PrintPrint | PrintAnalyze | PrintIngest
+    ]
 
 
 @cappa.command(name="add", invoke="printed.print.add_print")
@@ -99,23 +131,72 @@ class PrintPrint:
     name: str
 
 
+@cappa.command(name="analyze", invoke="printed.print.analyze_prints")
+@dataclass
+class PrintAnalyze:
+    """Record the mesh statistics (size, volume, etc) of every print's model files."""
+
+    workers: Annotated[int | None, cappa.Arg(short=True, long=True)] = None
+
+
+@cappa.command(name="ingest", invoke="printed.print.ingest_print")
+@dataclass
+class PrintIngest:
+    """Add sliced output (G-code or 3MF) to a print, filling in its duration and material usage.
+
+    The print is created (named after the file) if it does not already exist.
+    """
+
+    file: Path
+    name: Annotated[str | None, cappa.Arg(short=True, long=True)] = None
+    material: Annotated[
+        str | None,
+        cappa.Arg(short=True, long=True),
+        Doc("The material used, if not the slicer's filament type."),
+    ] = None
+
+
 @dataclass
 class Material:
     command: cappa.Subcommands[MaterialAdd | MaterialRemove]
 
 
 @cappa.command(name="add", invoke="printed.material.add")
+@dataclass
 class MaterialAdd:
     name: str
     unit: str
     price_per_unit: Annotated[float, cappa.Arg(short=True, long=True)] = 0.0
+    density: Annotated[
+        float | None,
+        cappa.Arg(short=True, long=True),
+        Doc("The material's density, in g/cm^3, used to estimate print weights."),
+    ] = None
 
 
 @cappa.command(name="remove", invoke="printed.material.remove")
+@dataclass
 class MaterialRemove:
     name: str
 
 
+@dataclass
+class Storage:
+    command: cappa.Subcommands[StorageImport | StorageExport]
+
+
+@cappa.command(name="import", invoke="printed.storage.import_prints")
+@dataclass
+class StorageImport:
+    """Import prints from the toml layout into the sqlite database."""
+
+
+@cappa.command(name="export", invoke="printed.storage.export_prints")
+@dataclass
+class StorageExport:
+    """Export prints from the sqlite database into the toml layout."""
+
+
 @dataclass
 class Web:
     host: Annotated[str, cappa.Arg(long=True, default=cappa.Env("HOST"))] = "127.0.0.1"
@@ -123,8 +204,28 @@ class Web:
         int, cappa.Arg(short=True, long=True, default=cappa.Env("PORT"))
     ] = 8000
     root_path: Annotated[str, cappa.Arg(long=True, default=cappa.Env("ROOT_PATH"))] = ""
+    workers: Annotated[
+        int,
+        cappa.Arg(long=True, default=cappa.Env("WORKERS")),
+        Doc("Serve from this many processes, sharing a snapshot of the library."),
+    ] = 1
 
     def __call__(self, command: Printed):
+        if self.workers > 1:
+            if command.backend != "toml":
+                raise cappa.Exit("--workers is only supported by the toml backend.")
+
+            from printed.web.workers import serve
+
+            serve(
+                command,
+                self.workers,
+                host=self.host,
+                port=self.port,
+                root_path=self.root_path,
+            )
+            return
+
         import uvicorn
 
         from printed.web.main import create_app
@@ -137,6 +238,12 @@ class Web:
         )
 
 
+def load_dotenv():
+    from dotenv import load_dotenv
+
+    load_dotenv()
+
+
 def run():
     try:
         cappa.invoke(Printed, deps=[load_dotenv])
@@ -0,0 +1,352 @@
+from __future__ import annotations
+
+import json
+import logging
+import os
+from collections.abc import Iterator
+from pathlib import Path, PurePath
+from typing import ClassVar
+
+from alembic import command
+from alembic.config import Config
+from pydantic.dataclasses import dataclass
+from sqlalchemy import Engine, ForeignKey, create_engine, delete, func, select
+from sqlalchemy.orm import (
+    DeclarativeBase,
+    Mapped,
+    Session,
+    mapped_column,
+    relationship,
+    selectinload,
+)
+from whenever import OffsetDateTime, TimeDelta
+
+from printed.path import type_adapter
+from printed.schema import (
+    DirectionOptions,
+    FilterOptions,
+    OrderOptions,
+    Print,
+    PrintStore,
+    Totals,
+    model_config,
+)
+from printed.summary import PrintSummary
+
+log = logging.getLogger(__name__)
+
+MIGRATIONS_DIR = Path(__file__).parent / "migrations"
+
+
+class Base(DeclarativeBase):
+    pass
+
+
+class PrintRow(Base):
+    __tablename__ = "print"
+
+    name: Mapped[str] = mapped_column(primary_key=True)
+    title: Mapped[str] = mapped_column(index=True)
+    created_at: Mapped[int] = mapped_column(index=True)
+    count: Mapped[int] = mapped_column(index=True)
+    saved: Mapped[float] = mapped_column(index=True)
+    reference_cost: Mapped[float]
+    weight: Mapped[float]
+    cost: Mapped[float]
+    duration: Mapped[float]
+
+    # The remainder of the print (links, materials), as json.
+    data: Mapped[str]
+
+    history: Mapped[list[PrintHistoryRow]] = relationship(
+        order_by="PrintHistoryRow.position",
+        cascade="all, delete-orphan",
+    )
+
+    @classmethod
+    def from_print(cls, print: Print) -> PrintRow:
+        data = print.dump()
+        history = data.pop("history")
+        return cls(
+            name=print.name,
+            title=print.title,
+            created_at=print.created_at.timestamp_nanos(),
+            count=print.count,
+            saved=print.total_saved,
+            reference_cost=print.reference_cost,
+            weight=print.weight,
+            cost=print.cost,
+            duration=print.duration.in_seconds(),
+            data=json.dumps(data),
+            history=[
+                PrintHistoryRow(position=position, **h)
+                for position, h in enumerate(history)
+            ],
+        )
+
+    def to_print(self, path: Path) -> Print:
+        data = json.loads(self.data)
+        data["history"] = [
+            {"printed_on": h.printed_on, "status": h.status} for h in self.history
+        ]
+        print = type_adapter(Print).validate_python(data)
+        print.path = path / self.name
+        return print
+
+    def to_summary(self) -> PrintSummary:
+        # The history is only needed for its count, which has its own column.
+        data = json.loads(self.data)
+        return PrintSummary(
+            name=self.name,
+            title=self.title,
+            created_at=OffsetDateTime.parse_common_iso(data["created_at"]),
+            count=self.count,
+            reference_cost=self.reference_cost,
+            weight=self.weight,
+            cost=self.cost,
+            duration=TimeDelta(seconds=self.duration),
+            source_links=tuple(
+                (link["url"], link["title"]) for link in data["source_links"]
+            ),
+            material_names=tuple(pm["material"] for pm in data["materials"]),
+        )
+
+
+class PrintHistoryRow(Base):
+    __tablename__ = "print_history"
+
+    id: Mapped[int] = mapped_column(primary_key=True)
+    print_name: Mapped[str] = mapped_column(
+        ForeignKey("print.name", ondelete="CASCADE"), index=True
+    )
+    position: Mapped[int]
+    printed_on: Mapped[str]
+    status: Mapped[str]
+
+
+def connect(path: Path) -> Engine:
+    engine = create_engine(f"sqlite:///{path}")
+    upgrade(engine)
+    return engine
+
+
+def upgrade(engine: Engine, revision: str = "head"):
+    config = Config(MIGRATIONS_DIR / "alembic.ini")
+    config.set_main_option("script_location", str(MIGRATIONS_DIR))
+
+    with engine.begin() as connection:
+        config.attributes["connection"] = connection
+        command.upgrade(config, revision)
+
+
+@dataclass(config=model_config)
+class SqlPrintStore(PrintStore):
+    engine: Engine | None = None
+    # The database file's version, as last written by this store; see `reload`.
+    written: tuple[int, int, bytes] | None = None
+
+    DATABASE_FILE: ClassVar[PurePath] = PurePath("printed.sqlite")
+
+    @classmethod
+    def collect(cls, path: Path, scan: bool = True):
+        # Listing the database's prints is a single query, so is never deferred.
+        instance = cls(path=path, engine=connect(path / cls.DATABASE_FILE))
+        instance.refresh()
+        return instance
+
+    def database_version(self) -> tuple[int, int, bytes] | None:
+        try:
+            with (self.path / self.DATABASE_FILE).open("rb") as f:
+                stat = os.fstat(f.fileno())
+                header = f.read(28)
+        except FileNotFoundError:
+            return None
+        # Bytes 24-28 of the header count the commits to the database.
+        return stat.st_mtime_ns, stat.st_size, header[24:28]
+
+    def session(self) -> Session:
+        assert self.engine
+        return Session(self.engine)
+
+    def __iter__(self) -> Iterator[Print]:
+        query = select(PrintRow).options(selectinload(PrintRow.history))
+
+        result = []
+        with self.session() as session:
+            for row in session.scalars(query.order_by(PrintRow.title)):
+                print = self.prints.get(row.name)
+                if print is None:
+                    print = self.cache(row.name, row.to_print(self.path))
+                result.append(print)
+        yield from result
+
+    def listing(self) -> Iterator[PrintSummary]:
+        yield from self.select("name", "asc", "all")
+
+    def load(self, name: str) -> Print:
+        with self.session() as session:
+            row = session.get(PrintRow, name, options=[selectinload(PrintRow.history)])
+            if row is None:
+                raise RuntimeError(f"{name} does not exist in {self.DATABASE_FILE}.")
+            return row.to_print(self.path)
+
+    def refresh(self):
+        with self.session() as session:
+            names = session.scalars(select(PrintRow.name)).all()
+
+        self.print_paths = {name: self.path / name for name in names}
+        self.listed = True
+        self.summary = None
+        self.generation += 1
+
+    def reload(self, name: str):
+        if name.startswith(self.DATABASE_FILE.name):
+            # Only the database itself is reloaded (not its journal), and only
+            # once changed by another process, rather than by this store's writes.
+            if name == self.DATABASE_FILE.name and (
+                self.written is None or self.database_version() != self.written
+            ):
+                self.invalidate()
+                self.refresh()
+            return
+
+        with self.lock(name), self.write_lock:
+            self.prints.pop(name, None)
+
+            with self.session() as session:
+                exists = session.get(PrintRow, name) is not None
+
+            if exists:
+                self.print_paths[name] = self.path / name
+            else:
+                self.print_paths.pop(name, None)
+
+            self.changed(name)
+
+    def preload(self, threads: int = 8) -> dict[str, Exception]:
+        # Listings are queried from the database as they are needed, so there is
+        # nothing to load up front.
+        return {}
+
+    def add(self, print: Print) -> Print:
+        print = super().add(print)
+        with self.session() as session:
+            print.revision = row_revision(session, print.name)
+        return print
+
+    def select(
+        self,
+        order: OrderOptions,
+        direction: DirectionOptions,
+        filter: FilterOptions,
+        offset: int = 0,
+        limit: int | None = None,
+    ) -> list[PrintSummary]:
+        columns = {
+            "created_at": PrintRow.created_at,
+            "count": PrintRow.count,
+            "saved": PrintRow.saved,
+        }
+        column = columns.get(order, PrintRow.title)
+
+        query = select(PrintRow)
+        if filter == "printed":
+            query = query.where(PrintRow.count > 0)
+        elif filter == "unprinted":
+            query = query.where(PrintRow.count == 0)
+
+        # Ties are broken by name, as in the toml store's indexes, so that pages
+        # neither repeat nor skip prints.
+        if direction == "desc":
+            query = query.order_by(column.desc(), PrintRow.name.desc())
+        else:
+            query = query.order_by(column.asc(), PrintRow.name.asc())
+        query = query.offset(offset).limit(limit)
+
+        with self.session() as session:
+            return [row.to_summary() for row in session.scalars(query)]
+
+    @property
+    def totals(self) -> Totals:
+        if self.summary is not None:
+            return self.summary
+
+        query = select(
+            func.total(PrintRow.reference_cost),
+            func.total(PrintRow.weight),
+            func.total(PrintRow.cost),
+            func.total(PrintRow.duration),
+            func.total(PrintRow.count),
+            func.total(PrintRow.weight * PrintRow.count),
+            func.total(PrintRow.cost * PrintRow.count),
+            func.total(PrintRow.saved),
+        )
+        with self.session() as session:
+            row = session.execute(query).one()
+
+        self.summary = Totals(
+            reference_cost=row[0],
+            weight=row[1],
+            cost=row[2],
+            print_time=TimeDelta(seconds=row[3]),
+            count=int(row[4]),
+            printed_weight=row[5],
+            printed_cost=row[6],
+            saved=row[7],
+        )
+        return self.summary
+
+    def update_totals(self, name: str):
+        self.summary = None
+
+    def write(self, *names: str):
+        # Queries read from the database, so writes cannot be deferred.
+        with self.write_lock:
+            for name in names:
+                if name in self.prints:
+                    self.prints[name].revision += 1
+            self.pending.update(names)
+        self.flush()
+
+    def flush(self, *names: str):
+        if not self.pending:
+            return
+
+        stale: list[str] = []
+        with self.write_lock, self.session() as session, session.begin():
+            pending, self.pending = self.pending, set()
+            for name in sorted(pending):
+                print = self.prints[name]
+                current = row_revision(session, name)
+                if current != print.revision - 1:
+                    log.warning(
+                        "Print '%s' was changed elsewhere (revision %s, expected %s), "
+                        "so the change to it was discarded",
+                        name,
+                        current,
+                        print.revision - 1,
+                    )
+                    stale.append(name)
+                    continue
+
+                session.execute(
+                    delete(PrintHistoryRow).where(PrintHistoryRow.print_name == name)
+                )
+                session.execute(delete(PrintRow).where(PrintRow.name == name))
+                session.add(PrintRow.from_print(print))
+
+        self.written = self.database_version()
+
+        for name in stale:
+            self.reload(name)
+        self.rejected.extend(stale)
+
+        self.summary = None
+        self.generation += 1
+
+
+def row_revision(session: Session, name: str) -> int:
+    data = session.scalar(select(PrintRow.data).where(PrintRow.name == name))
+    if data is None:
+        return 0
+    return json.loads(data).get("revision", 0)
@@ -0,0 +1,49 @@
+from __future__ import annotations
+
+import bisect
+from dataclasses import dataclass, field
+from typing import Any, Literal
+
+
+@dataclass
+class OrderIndex:
+    """Print names kept sorted by a key, so that any page is a slice."""
+
+    entries: list[tuple[Any, str]] = field(default_factory=list)
+    keys: dict[str, Any] = field(default_factory=dict)
+
+    def __len__(self) -> int:
+        return len(self.entries)
+
+    def __contains__(self, name: str) -> bool:
+        return name in self.keys
+
+    def insert(self, name: str, key: Any):
+        self.remove(name)
+
+        bisect.insort(self.entries, (key, name))
+        self.keys[name] = key
+
+    def remove(self, name: str):
+        if name not in self.keys:
+            return
+
+        key = self.keys.pop(name)
+        index = bisect.bisect_left(self.entries, (key, name))
+        del self.entries[index]
+
+    def slice(
+        self,
+        direction: Literal["asc", "desc"],
+        offset: int = 0,
+        limit: int | None = None,
+    ) -> list[str]:
+        size = len(self.entries)
+        start = min(offset, size)
+        stop = size if limit is None else min(size, start + limit)
+
+        if direction == "desc":
+            page = self.entries[size - stop : size - start][::-1]
+        else:
+            page = self.entries[start:stop]
+        return [name for _, name in page]
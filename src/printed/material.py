@@ -9,7 +9,9 @@ shape: TypeAlias = dict[str, Material]
 
 
 def add(printed: Printed, command: MaterialAdd):
-    state = State.collect(printed.path, read_materials=True)
+    state = State.collect(
+        printed.path, read_materials=True, fsync=printed.fsync, scan=False
+    )
 
     if command.name in state.materials:
         raise cappa.Exit(f"Material '{command.name}' already exists.")
@@ -18,13 +20,16 @@ def add(printed: Printed, command: MaterialAdd):
         name=command.name,
         unit=command.unit,
         price_per_unit=command.price_per_unit,
+        density=command.density,
     )
 
     state.write_materials()
 
 
 def remove(printed: Printed, command: MaterialRemove):
-    state = State.collect(printed.path, read_materials=True)
+    state = State.collect(
+        printed.path, read_materials=True, fsync=printed.fsync, scan=False
+    )
 
     if command.name not in state.materials:
         material_names = ", ".join(state.materials)
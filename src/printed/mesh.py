@@ -0,0 +1,231 @@
+from __future__ import annotations
+
+import struct
+import zlib
+from pathlib import Path
+from typing import TYPE_CHECKING, cast
+
+import numpy as np
+
+if TYPE_CHECKING:
+    import trimesh
+
+
+def load_mesh(path: Path) -> trimesh.Trimesh:
+    import trimesh
+
+    return cast(trimesh.Trimesh, trimesh.load(path, force="mesh"))
+
+
+def cluster_vertices(
+    vertices: np.ndarray, faces: np.ndarray, resolution: int
+) -> tuple[np.ndarray, np.ndarray]:
+    """Merge all vertices within each cell of a `resolution`^3 grid.
+
+    Each cluster is replaced by the mean of its vertices, and the faces which
+    collapse (or become duplicates) as a result are dropped.
+    """
+    lower = vertices.min(axis=0)
+    extent = float((vertices.max(axis=0) - lower).max()) or 1.0
+    cells = np.minimum(
+        ((vertices - lower) * (resolution / extent)).astype(np.int64),
+        resolution - 1,
+    )
+    keys = (cells[:, 0] * resolution + cells[:, 1]) * resolution + cells[:, 2]
+
+    _, inverse = np.unique(keys, return_inverse=True)
+    inverse = inverse.reshape(-1)
+    counts = np.bincount(inverse)
+    clustered = (
+        np.stack(
+            [np.bincount(inverse, weights=vertices[:, axis]) for axis in range(3)],
+            axis=1,
+        )
+        / counts[:, None]
+    )
+
+    remapped = inverse[faces]
+    a, b, c = remapped.T
+    remapped = remapped[(a != b) & (b != c) & (a != c)]
+
+    _, first = np.unique(np.sort(remapped, axis=1), axis=0, return_index=True)
+    return clustered, remapped[np.sort(first)]
+
+
+def decimate(
+    vertices: np.ndarray, faces: np.ndarray, triangles: int
+) -> tuple[np.ndarray, np.ndarray]:
+    """Reduce a mesh to at most (roughly) `triangles` faces by vertex clustering."""
+    if len(faces) <= triangles:
+        return vertices, faces
+
+    # A surface's face count grows with the square of the grid resolution, so
+    # a few rescaling steps converge on the triangle budget.
+    resolution = max(int(np.sqrt(triangles / 2)), 2)
+    result = cluster_vertices(vertices, faces, resolution)
+    for _ in range(4):
+        count = len(result[1])
+        if 0.8 * triangles <= count <= triangles:
+            break
+
+        resolution = max(int(resolution * np.sqrt(triangles / max(count, 1))), 2)
+        candidate = cluster_vertices(vertices, faces, resolution)
+        if len(candidate[1]) <= triangles or len(result[1]) > triangles:
+            result = candidate
+
+    return result
+
+
+def to_glb(vertices: np.ndarray, faces: np.ndarray) -> bytes:
+    import trimesh
+
+    mesh = trimesh.Trimesh(vertices=vertices, faces=faces, process=False)
+    return cast(bytes, mesh.export(file_type="glb"))
+
+
+def view_basis(direction: tuple[float, float, float]) -> np.ndarray:
+    """Rows are the screen right, screen up, and depth axes when looking along `direction` (z-up)."""
+    forward = np.asarray(direction, dtype=np.float64)
+    forward /= np.linalg.norm(forward)
+    right = np.cross(forward, (0.0, 0.0, 1.0))
+    right /= np.linalg.norm(right)
+    up = np.cross(right, forward)
+    return np.stack([right, up, forward])
+
+
+def rasterize(
+    vertices: np.ndarray,
+    faces: np.ndarray,
+    size: int = 128,
+    color: tuple[int, int, int] = (154, 164, 177),
+    direction: tuple[float, float, float] = (-1.0, 1.0, -0.8),
+    chunk_size: int = 1 << 22,
+) -> np.ndarray:
+    """Render an orthographic, flat shaded RGBA image of a mesh.
+
+    Every triangle is tested against the pixel centers within its bounding
+    box, and the nearest covering triangle (per a z-buffer) colors the pixel.
+    """
+    image = np.zeros((size, size, 4), dtype=np.uint8)
+    if not len(faces):
+        return image
+
+    view = vertices @ view_basis(direction).T
+
+    # Fit the model's screen extent to the image, with a small margin.
+    lower = view[:, :2].min(axis=0)
+    extent = float((view[:, :2].max(axis=0) - lower).max()) or 1.0
+    scale = (size - 2) / extent
+    offset = (size - (view[:, :2].max(axis=0) - lower) * scale) / 2
+    screen = (view[:, :2] - lower) * scale + offset
+    screen[:, 1] = size - screen[:, 1]
+
+    triangles = screen[faces]
+    depths = view[faces][:, :, 2]
+
+    # Flat shading, lit from the camera. Winding is not reliable across
+    # model files, so faces are lit the same from either side.
+    corners = view[faces]
+    normals = np.cross(corners[:, 1] - corners[:, 0], corners[:, 2] - corners[:, 0])
+    lengths = np.linalg.norm(normals, axis=1)
+    lengths[lengths == 0] = 1
+    shade = 0.25 + 0.75 * np.abs(normals[:, 2] / lengths)
+
+    low = np.clip(np.floor(triangles.min(axis=1) - 0.5), 0, size - 1).astype(np.int64)
+    high = np.clip(np.ceil(triangles.max(axis=1) - 0.5), 0, size - 1).astype(np.int64)
+    widths = high[:, 0] - low[:, 0] + 1
+    heights = high[:, 1] - low[:, 1] + 1
+    areas = widths * heights
+
+    zbuffer = np.full(size * size, np.inf)
+    pixel_shade = np.zeros(size * size)
+
+    start = 0
+    cumulative = np.cumsum(areas)
+    while start < len(faces):
+        stop = max(
+            int(
+                np.searchsorted(
+                    cumulative, cumulative[start] - areas[start] + chunk_size
+                )
+            ),
+            start + 1,
+        )
+        stop = min(stop, len(faces))
+        index = np.repeat(np.arange(start, stop), areas[start:stop])
+
+        # The position of each candidate pixel within its triangle's bounding box.
+        firsts = np.cumsum(areas[start:stop]) - areas[start:stop]
+        local = np.arange(len(index)) - np.repeat(firsts, areas[start:stop])
+        px = low[index, 0] + local % widths[index]
+        py = low[index, 1] + local // widths[index]
+
+        a, b, c = (triangles[index, i] for i in range(3))
+        x, y = px + 0.5, py + 0.5
+        denominator = (b[:, 1] - c[:, 1]) * (a[:, 0] - c[:, 0]) + (
+            c[:, 0] - b[:, 0]
+        ) * (a[:, 1] - c[:, 1])
+        valid = denominator != 0
+        denominator[~valid] = 1
+        w0 = (
+            (b[:, 1] - c[:, 1]) * (x - c[:, 0]) + (c[:, 0] - b[:, 0]) * (y - c[:, 1])
+        ) / (denominator)
+        w1 = (
+            (c[:, 1] - a[:, 1]) * (x - c[:, 0]) + (a[:, 0] - c[:, 0]) * (y - c[:, 1])
+        ) / (denominator)
+        w2 = 1 - w0 - w1
+        inside = valid & (w0 >= 0) & (w1 >= 0) & (w2 >= 0)
+
+        index, px, py = index[inside], px[inside], py[inside]
+        depth = (
+            w0[inside] * depths[index, 0]
+            + w1[inside] * depths[index, 1]
+            + w2[inside] * depths[index, 2]
+        )
+        pixel = py * size + px
+
+        # Keep the nearest sample per pixel: sort by depth, then take the
+        # first occurrence of each pixel.
+        order = np.lexsort((depth, pixel))
+        pixel, depth, index = pixel[order], depth[order], index[order]
+        first = np.ones(len(pixel), dtype=bool)
+        first[1:] = pixel[1:] != pixel[:-1]
+        pixel, depth, index = pixel[first], depth[first], index[first]
+
+        nearer = depth < zbuffer[pixel]
+        zbuffer[pixel[nearer]] = depth[nearer]
+        pixel_shade[pixel[nearer]] = shade[index[nearer]]
+        start = stop
+
+    covered = np.isfinite(zbuffer).reshape(size, size)
+    image[..., :3] = (
+        pixel_shade.reshape(size, size, 1) * np.asarray(color, dtype=np.float64)
+    ).astype(np.uint8)
+    image[..., 3] = np.where(covered, 255, 0)
+    return image
+
+
+def encode_png(image: np.ndarray) -> bytes:
+    """Encode an 8-bit RGBA image (height x width x 4) as a PNG."""
+    height, width, _ = image.shape
+
+    # Each scanline is prefixed with its filter type (0, none).
+    scanlines = np.zeros((height, width * 4 + 1), dtype=np.uint8)
+    scanlines[:, 1:] = image.reshape(height, width * 4)
+
+    def chunk(kind: bytes, data: bytes) -> bytes:
+        return (
+            struct.pack(">I", len(data))
+            + kind
+            + data
+            + struct.pack(">I", zlib.crc32(kind + data))
+        )
+
+    return b"".join(
+        [
+            b"\x89PNG\r\n\x1a\n",
+            chunk(b"IHDR", struct.pack(">IIBBBBB", width, height, 8, 6, 0, 0, 0)),
+            chunk(b"IDAT", zlib.compress(scanlines.tobytes(), 9)),
+            chunk(b"IEND", b""),
+        ]
+    )
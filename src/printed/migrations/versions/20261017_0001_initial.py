@@ -0,0 +1,70 @@
+"""Initial print and print history tables.
+
+Revision ID: 0001
+Revises:
+Create Date: 2026-10-17 11:11:17.680103
+
+"""
+from collections.abc import Sequence
+
+import sqlalchemy as sa
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "0001"
+down_revision: str | None = None
+branch_labels: str | Sequence[str] | None = None
+depends_on: str | Sequence[str] | None = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "print",
+        sa.Column("name", sa.String(), nullable=False),
+        sa.Column("title", sa.String(), nullable=False),
+        sa.Column("created_at", sa.Integer(), nullable=False),
+        sa.Column("count", sa.Integer(), nullable=False),
+        sa.Column("saved", sa.Float(), nullable=False),
+        sa.Column("reference_cost", sa.Float(), nullable=False),
+        sa.Column("weight", sa.Float(), nullable=False),
+        sa.Column("cost", sa.Float(), nullable=False),
+        sa.Column("duration", sa.Float(), nullable=False),
+        sa.Column("data", sa.String(), nullable=False),
+        sa.PrimaryKeyConstraint("name"),
+    )
+    with op.batch_alter_table("print", schema=None) as batch_op:
+        batch_op.create_index(batch_op.f("ix_print_count"), ["count"], unique=False)
+        batch_op.create_index(
+            batch_op.f("ix_print_created_at"), ["created_at"], unique=False
+        )
+        batch_op.create_index(batch_op.f("ix_print_saved"), ["saved"], unique=False)
+        batch_op.create_index(batch_op.f("ix_print_title"), ["title"], unique=False)
+
+    op.create_table(
+        "print_history",
+        sa.Column("id", sa.Integer(), nullable=False),
+        sa.Column("print_name", sa.String(), nullable=False),
+        sa.Column("position", sa.Integer(), nullable=False),
+        sa.Column("printed_on", sa.String(), nullable=False),
+        sa.Column("status", sa.String(), nullable=False),
+        sa.ForeignKeyConstraint(["print_name"], ["print.name"], ondelete="CASCADE"),
+        sa.PrimaryKeyConstraint("id"),
+    )
+    with op.batch_alter_table("print_history", schema=None) as batch_op:
+        batch_op.create_index(
+            batch_op.f("ix_print_history_print_name"), ["print_name"], unique=False
+        )
+
+
+def downgrade() -> None:
+    with op.batch_alter_table("print_history", schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f("ix_print_history_print_name"))
+
+    op.drop_table("print_history")
+    with op.batch_alter_table("print", schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f("ix_print_title"))
+        batch_op.drop_index(batch_op.f("ix_print_saved"))
+        batch_op.drop_index(batch_op.f("ix_print_created_at"))
+        batch_op.drop_index(batch_op.f("ix_print_count"))
+
+    op.drop_table("print")
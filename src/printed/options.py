@@ -0,0 +1,6 @@
+from typing import Literal, TypeAlias
+
+# Choices for command line arguments, kept apart from the (slow to import)
+# modules which use them, so that arguments can be parsed without importing those.
+Backend: TypeAlias = Literal["toml", "sqlite"]
+FsyncPolicy: TypeAlias = Literal["none", "file", "full"]
@@ -1,13 +1,78 @@
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import sys
+import threading
+from collections.abc import Callable, Iterator
+from contextlib import contextmanager
+from dataclasses import dataclass
 from pathlib import Path
-from typing import TypeVar
+from typing import Any, TypeVar
 
 import tomlkit
+import tomllib
 from pydantic import TypeAdapter
+from tomlkit.container import Container
+from tomlkit.items import Table
+
+from printed.options import FsyncPolicy
+
+if sys.platform != "win32":
+    import fcntl
 
 T = TypeVar("T")
 
 
-def get_content(path: Path, type: type[T], *, default: T | None = None) -> T:
+type_adapters: dict[Any, TypeAdapter] = {}
+
+
+def type_adapter(type: type[T]) -> TypeAdapter[T]:
+    adapter = type_adapters.get(type)
+    if adapter is None:
+        adapter = type_adapters[type] = TypeAdapter(type)
+    return adapter
+
+
+@dataclass(frozen=True)
+class Codec:
+    name: str
+    loads: Callable[[bytes], Any]
+    dumps: Callable[[Any], bytes]
+
+
+def _tomllib_loads(content: bytes) -> Any:
+    return tomllib.loads(content.decode("utf-8"))
+
+
+def _tomlkit_loads(content: bytes) -> Any:
+    return tomlkit.loads(content).unwrap()
+
+
+def _toml_dumps(data: Any) -> bytes:
+    # The stdlib has no toml writer, so dumping always goes through tomlkit.
+    return tomlkit.dumps(data).encode("utf-8")
+
+
+def _json_loads(content: bytes) -> Any:
+    return json.loads(content)
+
+
+def _json_dumps(data: Any) -> bytes:
+    return json.dumps(data).encode("utf-8")
+
+
+TOML = Codec("toml", _tomllib_loads, _toml_dumps)
+TOMLKIT = Codec("tomlkit", _tomlkit_loads, _toml_dumps)
+JSON = Codec("json", _json_loads, _json_dumps)
+
+codecs: dict[str, Codec] = {codec.name: codec for codec in (TOML, TOMLKIT, JSON)}
+
+
+def get_content(
+    path: Path, type: type[T], *, default: T | None = None, codec: Codec = TOML
+) -> T:
     parent = path.parent
     if not parent.exists():
         parent.mkdir(exist_ok=True)
@@ -19,23 +84,138 @@ def get_content(path: Path, type: type[T], *, default: T | None = None) -> T:
 
     content = path.read_bytes()
 
-    data = tomlkit.loads(content).unwrap()
+    data = codec.loads(content)
+    return type_adapter(type).validate_python(data)
 
-    type_adapter = TypeAdapter(type)
-    return type_adapter.validate_python(data)
 
+def write_content(
+    path: Path,
+    type: type[T],
+    inp: T,
+    *,
+    codec: Codec = TOML,
+    preserve: bool = False,
+    fsync: FsyncPolicy = "none",
+):
+    """Write `inp` to `path`, atomically.
 
-def write_content(path: Path, type: type[T], inp: T):
+    With `preserve`, an existing toml file is updated through tomlkit's
+    document model, retaining any comments and formatting in it.
+    """
     parent = path.parent
     if not parent.exists():
         parent.mkdir(exist_ok=True)
 
-    type_adapter = TypeAdapter(type)
-    data = type_adapter.dump_python(inp, mode="json")
-    result = tomlkit.dumps(data).encode("utf-8")
+    # toml has no null; unset optional fields are left out, and so read back as such.
+    data = type_adapter(type).dump_python(inp, mode="json", exclude_none=True)
+
+    if preserve and path.exists():
+        document = tomlkit.loads(path.read_bytes())
+        merge_document(document, data)
+        result = tomlkit.dumps(document).encode("utf-8")
+    else:
+        result = codec.dumps(data)
 
-    path.write_bytes(result)
+    atomic_write(path, result, fsync=fsync)
+    written.record(path, result)
+
+
+@dataclass
+class WrittenFiles:
+    """The content last written by this process to each (settings) file.
+
+    Lets a file watcher recognize the changes it is notified of which are this
+    process' own writes, whose content is already in memory.
+    """
+
+    hashes: dict[str, bytes]
+    lock: threading.Lock
+
+    @staticmethod
+    def digest(content: bytes) -> bytes:
+        return hashlib.blake2b(content, digest_size=16).digest()
+
+    def record(self, path: Path, content: bytes):
+        with self.lock:
+            self.hashes[str(path.absolute())] = self.digest(content)
+
+    def matches(self, path: Path) -> bool:
+        """Whether `path` still holds the content this process last wrote to it."""
+        with self.lock:
+            expected = self.hashes.get(str(path.absolute()))
+        if expected is None:
+            return False
+
+        try:
+            content = path.read_bytes()
+        except OSError:
+            return False
+        return self.digest(content) == expected
+
+
+written = WrittenFiles(hashes={}, lock=threading.Lock())
+
+
+def atomic_write(path: Path, content: bytes, *, fsync: FsyncPolicy = "none"):
+    """Write beside `path` and rename over it, so readers never see a partial file.
+
+    `fsync` controls durability: "file" flushes the content to disk before the
+    rename, and "full" also flushes the directory, so the rename itself survives
+    a crash.
+    """
+    tmp_path = path.with_name(f".{path.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+    try:
+        with tmp_path.open("wb") as f:
+            f.write(content)
+            if fsync != "none":
+                f.flush()
+                os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+    except BaseException:
+        tmp_path.unlink(missing_ok=True)
+        raise
+
+    if fsync == "full":
+        fd = os.open(path.parent, os.O_RDONLY)
+        try:
+            os.fsync(fd)
+        finally:
+            os.close(fd)
+
+
+@contextmanager
+def file_lock(path: Path) -> Iterator[None]:
+    """Hold an exclusive advisory lock, shared with any other process locking `path`.
+
+    The lock file is separate from the file being guarded, because `atomic_write`
+    replaces that file (and with it, any lock held upon it).
+    """
+    with path.open("ab") as f:
+        if sys.platform != "win32":
+            fcntl.flock(f.fileno(), fcntl.LOCK_EX)
+        yield
+
+
+def merge_document(document: Container | Table, data: dict[str, Any]):
+    for key in list(document.keys()):
+        if key not in data:
+            del document[key]
+
+    for key, value in data.items():
+        existing = document.get(key)
+        if isinstance(value, dict) and isinstance(existing, Container | Table):
+            merge_document(existing, value)
+        elif existing is None or existing.unwrap() != value:
+            document[key] = value
 
 
 def safe_path(name: str):
     return name.lower().replace(" ", "_").replace(":", "-")
+
+
+def file_hash(path: Path, chunk_size: int = 1024 * 1024) -> str:
+    digest = hashlib.sha256()
+    with path.open("rb") as f:
+        while chunk := f.read(chunk_size):
+            digest.update(chunk)
+    return digest.hexdigest()
@@ -0,0 +1,257 @@
+from __future__ import annotations
+
+import asyncio
+import hashlib
+import logging
+import multiprocessing
+import os
+import signal
+from collections.abc import Callable, Iterable
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from dataclasses import dataclass, field
+from multiprocessing.queues import SimpleQueue
+from pathlib import Path
+from typing import Literal
+
+from printed.path import atomic_write
+from printed.schema import PrintFile
+
+log = logging.getLogger(__name__)
+
+PreviewStatus = Literal["ready", "pending", "failed"]
+
+
+@dataclass
+class PreviewCache:
+    """Rendered previews of model files, stored on disk by path, size and mtime.
+
+    The cache is bounded by total size; the least recently used entries are
+    evicted first.
+    """
+
+    path: Path
+    max_size: int = 512 * 1024 * 1024
+    suffix: str = ".glb"
+
+    def key(self, file: Path) -> str:
+        # Identified by the file's path, size and mtime, rather than by hashing
+        # its content, so that finding a cached preview never reads the model.
+        stat = file.stat()
+        identity = f"{file.absolute()}\0{stat.st_size}\0{stat.st_mtime_ns}"
+        return hashlib.blake2b(identity.encode(), digest_size=16).hexdigest()
+
+    def entry(self, key: str) -> Path:
+        return self.path / f"{key}{self.suffix}"
+
+    def get(self, key: str) -> Path | None:
+        path = self.entry(key)
+        try:
+            os.utime(path)
+        except FileNotFoundError:
+            return None
+        return path
+
+    def put(self, key: str, content: bytes) -> Path:
+        self.path.mkdir(parents=True, exist_ok=True)
+
+        path = self.entry(key)
+        atomic_write(path, content)
+
+        self.evict()
+        return path
+
+    def evict(self):
+        entries = []
+        for entry in os.scandir(self.path):
+            if entry.name.startswith(".") or not entry.is_file():
+                continue
+            stat = entry.stat()
+            entries.append((stat.st_mtime_ns, stat.st_size, entry.path))
+
+        total = sum(size for _, size, _ in entries)
+        for _, size, path in sorted(entries):
+            if total <= self.max_size:
+                break
+
+            log.info("Evicting cached preview: %s", path)
+            Path(path).unlink(missing_ok=True)
+            total -= size
+
+
+def render_preview(path: Path, triangles: int = 100_000) -> bytes:
+    return PrintFile(path).preview(triangles)
+
+
+def render_thumbnail(path: Path, size: int = 128) -> bytes:
+    return PrintFile(path).thumbnail(size)
+
+
+def report_pid(pids: SimpleQueue):
+    pids.put(os.getpid())
+
+
+@dataclass
+class PreviewQueue:
+    """Generates previews in a pool of worker processes, off the request path.
+
+    Jobs are deduplicated by cache key, so a file which is already being
+    rendered is never submitted twice. Jobs exceeding `timeout` are recorded
+    as failed (and not retried), and the pool is replaced, as it is once any
+    of its workers dies.
+
+    A `remote` queue has no pool of its own; it leaves its jobs as requests
+    in the (shared) cache, for the one queue which `forward`s them to run.
+    """
+
+    cache: PreviewCache
+    render: Callable[[Path], bytes] = render_preview
+    workers: int = 2
+    timeout: float = 60.0
+    remote: bool = False
+
+    executor: ProcessPoolExecutor | None = None
+    # The pids of the pool's workers, which each reports as it starts.
+    pids: SimpleQueue | None = None
+    slots: asyncio.Semaphore | None = None
+    jobs: dict[str, asyncio.Task] = field(default_factory=dict)
+    failed: set[str] = field(default_factory=set)
+
+    def start(self):
+        # Jobs only reach the pool once a worker is free, so time spent queued
+        # does not count against a job's timeout.
+        self.slots = self.slots or asyncio.Semaphore(self.workers)
+        context = multiprocessing.get_context("spawn")
+        self.pids = context.SimpleQueue()
+        self.executor = ProcessPoolExecutor(
+            max_workers=self.workers,
+            mp_context=context,
+            initializer=report_pid,
+            initargs=(self.pids,),
+        )
+
+    def shutdown(self):
+        for job in self.jobs.values():
+            job.cancel()
+
+        if self.executor:
+            self.executor.shutdown(wait=False, cancel_futures=True)
+            self.executor = None
+
+    def restart(self, executor: ProcessPoolExecutor | None):
+        """Replace the pool, unless `executor` has already been replaced.
+
+        A running job cannot be cancelled, so the old pool's workers are
+        terminated; any other job they were running is retried on demand.
+        """
+        if executor is None or executor is not self.executor:
+            return
+
+        pids = self.pids
+        self.start()
+        executor.shutdown(wait=False, cancel_futures=True)
+
+        while pids is not None and not pids.empty():
+            try:
+                os.kill(pids.get(), signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+
+    async def submit(self, file: Path, key: str | None = None) -> PreviewStatus:
+        if key is None:
+            key = await asyncio.to_thread(self.cache.key, file)
+
+        if key in self.failed:
+            return "failed"
+
+        if key not in self.jobs:
+            path = await asyncio.to_thread(self.cache.get, key)
+            if path is not None:
+                return "ready"
+
+        if self.remote:
+            return await asyncio.to_thread(self.request, key, file)
+
+        # Checked again, since another request may have queued it meanwhile.
+        if key not in self.jobs:
+            self.jobs[key] = asyncio.create_task(self.run(key, file))
+        return "pending"
+
+    @property
+    def requests(self) -> Path:
+        return self.cache.path / ".requests"
+
+    def request(self, key: str, file: Path) -> PreviewStatus:
+        if (self.requests / f"{key}.failed").exists():
+            return "failed"
+
+        path = self.requests / key
+        if not path.exists():
+            self.requests.mkdir(parents=True, exist_ok=True)
+            atomic_write(path, str(file.absolute()).encode())
+        return "pending"
+
+    async def forward(self, interval: float = 0.5):
+        """Run the jobs which `remote` queues request, until cancelled.
+
+        A request is kept until its job is done, or else marked as failed.
+        """
+        while True:
+            try:
+                requests = await asyncio.to_thread(os.listdir, self.requests)
+            except FileNotFoundError:
+                requests = []
+
+            for key in requests:
+                if key.startswith(".") or key.endswith(".failed"):
+                    continue
+
+                path = self.requests / key
+                try:
+                    file = Path(await asyncio.to_thread(path.read_text))
+                    status = await self.submit(file, key)
+                except OSError:
+                    continue
+
+                if status == "failed":
+                    await asyncio.to_thread(
+                        path.rename, path.with_name(f"{key}.failed")
+                    )
+                elif status == "ready":
+                    await asyncio.to_thread(path.unlink, missing_ok=True)
+
+            await asyncio.sleep(interval)
+
+    async def submit_all(self, files: Iterable[Path]):
+        for file in files:
+            try:
+                await self.submit(file)
+            except OSError:
+                log.info("Unable to queue preview of %s", file, exc_info=True)
+
+    async def run(self, key: str, file: Path):
+        assert self.slots
+        loop = asyncio.get_running_loop()
+        executor = self.executor
+        try:
+            async with self.slots:
+                executor = self.executor
+                content = await asyncio.wait_for(
+                    loop.run_in_executor(executor, self.render, file),
+                    self.timeout,
+                )
+            await asyncio.to_thread(self.cache.put, key, content)
+        except TimeoutError:
+            log.warning("Preview of %s exceeded %ss", file, self.timeout)
+            self.failed.add(key)
+            self.restart(executor)
+        except BrokenProcessPool:
+            # A worker died (perhaps of this job, or another), which leaves the
+            # pool unusable; the job is retried on demand, by the new pool.
+            log.warning("Preview of %s was interrupted", file, exc_info=True)
+            self.restart(executor)
+        except Exception:
+            log.exception("Preview of %s failed", file)
+            self.failed.add(key)
+        finally:
+            self.jobs.pop(key, None)
@@ -1,10 +1,14 @@
+import shutil
+from pathlib import Path
 from typing import Annotated, TypeAlias
 
 import cappa
 
 from printed.cli.base import (
     PrintAdd,
+    PrintAnalyze,
     Printed,
+    PrintIngest,
     PrintList,
     PrintPrint,
     PrintRemove,
@@ -15,6 +19,7 @@ from printed.console import Console
 from printed.formatting import format_cost
 from printed.path import safe_path
 from printed.schema import Link, Print, PrintMaterial, State
+from printed.slicer import SlicerMetadata
 
 shape: TypeAlias = dict[str, Print]
 PRINT_FILE = "settings.json"
@@ -25,9 +30,6 @@ def add_print(
     command: PrintAdd,
 ) -> Print:
     name = command.name or safe_path(command.title)
-    if name in state.prints and not command.force:
-        raise cappa.Exit(f"Print '{command.title}' already exists.")
-
     print_materials = []
     for cli_material in command.materials:
         cli_material_name, unit_count = cli_material.split("=")
@@ -39,24 +41,30 @@ def add_print(
             )
 
         print_material = PrintMaterial(
-            material=name,
+            material=cli_material_name,
             unit_count=int(unit_count),
             price_per_unit=material.price_per_unit,
         )
         print_materials.append(print_material)
 
-    print = state.prints.add(
-        Print(
-            name=name,
-            title=command.title,
-            reference_cost=command.reference_cost,
-            duration=command.duration,
-            source_links=[Link(url=link) for link in command.source_links],
-            reference_links=[Link(url=link) for link in command.reference_links],
-            materials=print_materials,
+    # Held from the existence check until the print is written, so that
+    # concurrent adds of the same print cannot both succeed.
+    with state.prints.lock(name):
+        if name in state.prints and not command.force:
+            raise cappa.Exit(f"Print '{command.title}' already exists.")
+
+        print = state.prints.add(
+            Print(
+                name=name,
+                title=command.title,
+                reference_cost=command.reference_cost,
+                duration=command.duration,
+                source_links=[Link(url=link) for link in command.source_links],
+                reference_links=[Link(url=link) for link in command.reference_links],
+                materials=print_materials,
+            )
         )
-    )
-    print.write()
+        state.prints.write(print.name)
     return print
 
 
@@ -65,9 +73,13 @@ def list_prints(
     console: Annotated[Console, cappa.Dep(console)],
     _: PrintList,
 ):
+    for name, error in state.prints.preload().items():
+        console.warn(f"Unable to load print '{name}': {error}")
+
     columns = ["Name", "Count", "Total Cost"]
     table_result: list[tuple[str, ...]] = [
-        (r.title, str(r.count), format_cost(r.total_printed_cost)) for r in state.prints
+        (r.title, str(r.count), format_cost(r.total_printed_cost))
+        for r in state.prints.listing()
     ]
 
     console.table(
@@ -83,11 +95,11 @@ def remove_print(
     print = state.prints.get(command.name)
 
     if not print:
-        print_names = ", ".join(p.name for p in state.prints)
+        print_names = ", ".join(p.name for p in state.prints.listing())
         raise cappa.Exit(f"Print '{command.name}' not found from: {print_names}.")
 
     print.delete()
-    print.write()
+    state.prints.write(print.name)
 
 
 def print_print(state: Annotated[State, cappa.Dep(state)], command: PrintPrint):
@@ -98,4 +110,55 @@ def print_print(state: Annotated[State, cappa.Dep(state)], command: PrintPrint):
         raise cappa.Exit(f"Invalid print {name}")
 
     print.append_history()
-    print.write()
+    state.prints.write(print.name)
+
+
+def analyze_prints(
+    state: Annotated[State, cappa.Dep(state)],
+    console: Annotated[Console, cappa.Dep(console)],
+    command: PrintAnalyze,
+):
+    count = state.analyze_meshes(workers=command.workers)
+    console.info(f"Analyzed {count} model files.")
+
+
+def ingest_print(
+    state: Annotated[State, cappa.Dep(state)],
+    console: Annotated[Console, cappa.Dep(console)],
+    command: PrintIngest,
+) -> Print:
+    if not command.file.is_file():
+        raise cappa.Exit(f"No such file: {command.file}.")
+
+    name = safe_path(command.name or command.file.name.split(".")[0])
+    print = state.prints.get(name)
+    if print is None:
+        title = command.name or command.file.name.split(".")[0]
+        print = state.prints.add(Print(name=name, title=title))
+        print.path.mkdir(parents=True, exist_ok=True)
+
+    target = print.path / command.file.name
+    if not target.exists() or not target.samefile(command.file):
+        shutil.copyfile(command.file, target)
+
+    metadata = ingest_file(state, print, target, command.material)
+    if metadata.grams and not state.find_material(
+        command.material or metadata.material
+    ):
+        console.warn(
+            f"No material matches '{command.material or metadata.material}', "
+            f"so {metadata.grams}g of usage was not recorded."
+        )
+    return print
+
+
+def ingest_file(
+    state: State, print: Print, path: Path, material: str | None = None
+) -> SlicerMetadata:
+    metadata = SlicerMetadata.read(path)
+    with state.prints.lock(print.name):
+        # The print may have been reloaded (or evicted) since it was fetched.
+        print = state.prints[print.name]
+        print.ingest(metadata, state.find_material(material or metadata.material))
+        state.prints.write(print.name)
+    return metadata
@@ -1,9 +1,18 @@
 from __future__ import annotations
 
+import hashlib
+import json
 import logging
-from collections.abc import Iterator
+import os
+import threading
+import time
+import zipfile
+from collections import OrderedDict
+from collections.abc import Iterable, Iterator
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
 from pathlib import Path, PurePath
-from typing import ClassVar, Literal, Self, assert_never, cast, TypeAlias
+from typing import ClassVar, Literal, Self, TypeAlias, assert_never, get_args
 from urllib.parse import urlparse
 
 from pydantic import (
@@ -16,8 +25,21 @@ from pydantic import (
 from pydantic.dataclasses import dataclass
 from whenever import OffsetDateTime, TimeDelta
 
+from printed.analytics import MeshIndex, MeshStats
+from printed.catalog import Catalog
 from printed.formatting import parse_duration
-from printed.path import get_content, write_content
+from printed.index import OrderIndex
+from printed.options import Backend
+from printed.path import (
+    TOML,
+    FsyncPolicy,
+    file_lock,
+    get_content,
+    type_adapter,
+    write_content,
+)
+from printed.slicer import SlicerMetadata
+from printed.summary import PrintSummary
 
 log = logging.getLogger(__name__)
 
@@ -31,57 +53,364 @@ class Investment:
 
 
 OrderOptions: TypeAlias = Literal["created_at", "count", "name", "saved"]
+DirectionOptions: TypeAlias = Literal["asc", "desc"]
+FilterOptions: TypeAlias = Literal["all", "printed", "unprinted"]
 
 
-@dataclass
+@dataclass(config=model_config)
 class PrintStore:
     path: Path
 
     print_paths: dict[str, Path] = Field(default_factory=dict)
-    prints: dict[str, Print] = Field(default_factory=dict)
-    cached: set[str] = Field(default_factory=set)
+    # Loaded prints, least recently used first. Beyond `max_prints`, the oldest
+    # are evicted, other than those pending a write or locked by an edit.
+    prints: OrderedDict[str, Print] = Field(default_factory=OrderedDict)
+    max_prints: int | None = None
+    hits: int = 0
+    misses: int = 0
+    evictions: int = 0
+    # What listings show of each print, so that they never load prints in full.
+    summaries: dict[str, PrintSummary] = Field(default_factory=dict)
+    catalog: Catalog = Field(default_factory=Catalog)
+    # Whether `print_paths` (and `catalog`) hold the whole library; until then,
+    # prints are looked up individually.
+    listed: bool = False
+
+    # Per-print contributions to `totals`, maintained as prints change.
+    contributions: dict[str, Totals] | None = None
+    summary: Totals | None = None
+    order_indexes: dict[tuple[OrderOptions, FilterOptions], OrderIndex] | None = None
+
+    # Incremented whenever any print may have changed.
+    generation: int = 0
+
+    # Prints written (in memory) since the last `flush`, and the flush policy.
+    pending: set[str] = Field(default_factory=set)
+    write_delay: float = 0.0
+    fsync: FsyncPolicy = "file"
+    flush_timer: threading.Timer | None = None
+    write_lock: threading.RLock = Field(default_factory=threading.RLock)
+
+    # Held while a print is modified, so that concurrent edits apply in turn.
+    locks: dict[str, threading.RLock] = Field(default_factory=dict)
+    holders: dict[str, int] = Field(default_factory=dict)
+    # Prints whose writes were rejected, having been changed elsewhere.
+    rejected: list[str] = Field(default_factory=list)
+    # Prints which could not be loaded by `preload`, skipped by iteration.
+    errors: dict[str, Exception] = Field(default_factory=dict)
+
+    CATALOG_FILE: ClassVar[PurePath] = PurePath(".catalog.json")
 
     @classmethod
-    def collect(cls, path: Path):
+    def collect(cls, path: Path, scan: bool = True):
+        """Collect the store, listing the whole library up front when `scan` is set.
+
+        Otherwise the library is only listed once it's iterated, so that reading
+        or writing a single print costs the same however large the library is.
+        """
         instance = cls(path=path)
-        instance.refresh()
+        if scan:
+            instance.refresh()
         return instance
 
+    @property
+    def catalog_path(self) -> Path:
+        return self.path / self.CATALOG_FILE
+
     def __iter__(self) -> Iterator[Print]:
-        for print in self.print_paths:
-            yield self[print]
+        if not self.listed:
+            self.refresh()
+
+        for print in self.names():
+            if print not in self.errors:
+                yield self[print]
+
+        if self.catalog.stale:
+            with self.write_lock:
+                self.catalog.write(self.catalog_path)
+
+    def listing(self) -> Iterator[PrintSummary]:
+        """Iterate the summaries of every print, without keeping any in full."""
+        if not self.listed:
+            self.refresh()
+
+        for name in self.names():
+            summary = self.available(name)
+            if summary is not None:
+                yield summary
+
+        if self.catalog.stale:
+            with self.write_lock:
+                self.catalog.write(self.catalog_path)
+
+    def names(self) -> list[str]:
+        """Copy the names of listed prints, which `reload` may change meanwhile."""
+        with self.write_lock:
+            return list(self.print_paths)
 
     def __contains__(self, name: str) -> bool:
-        return name in self.print_paths
+        if name in self.print_paths:
+            return True
+        if self.listed or name.startswith("."):
+            return False
+
+        path = self.path / name
+        if not path.is_dir():
+            return False
+
+        self.print_paths[name] = path
+        return True
 
     def __getitem__(self, name: str) -> Print:
-        if name in self.cached:
-            return self.prints[name]
+        with self.write_lock:
+            print = self.prints.get(name)
+            if print is not None:
+                self.prints.move_to_end(name)
+                self.hits += 1
+                return print
+            self.misses += 1
+
+        return self.cache(name, self.load(name))
+
+    def cache(self, name: str, print: Print) -> Print:
+        with self.write_lock:
+            # Should another thread have loaded the print meanwhile, its copy is
+            # kept, so that edits are never split between two copies.
+            existing = self.prints.get(name)
+            if existing is not None:
+                self.prints.move_to_end(name)
+                return existing
+
+            self.evict(room=1)
+            self.prints[name] = print
+        return print
+
+    def evict(self, room: int = 0):
+        """Drop the least recently used prints, until `room` more fit within `max_prints`."""
+        if self.max_prints is None:
+            return
+
+        with self.write_lock:
+            excess = len(self.prints) + room - self.max_prints
+            evicted: list[str] = []
+            for name in self.prints:
+                if len(evicted) >= excess:
+                    break
+                if name not in self.pending and name not in self.holders:
+                    evicted.append(name)
+
+            for name in evicted:
+                del self.prints[name]
+            self.evictions += len(evicted)
+
+    def load(self, name: str) -> Print:
+        """Load a print, preferring the catalog entry when it is still fresh.
+
+        The settings file is `stat`-ed before it is read, so a concurrent write
+        can only ever cause an entry to look stale, never fresh.
+        """
+        print_path = self.path / name
+        try:
+            stat = (print_path / Print.SETTINGS_FILE).stat()
+        except FileNotFoundError:
+            return Print.collect(self.path, name)
+
+        data = self.catalog.get(name, stat)
+        if data is not None:
+            print = type_adapter(Print).validate_python(data)
+            print.path = print_path
+            return print
 
         print = Print.collect(self.path, name)
-        self.cached.add(name)
-        self.prints[name] = print
+        self.catalog.record(name, stat, print.dump())
         return print
 
-    def invalidate(self):
-        self.cached = set()
+    def summarize(self, name: str) -> PrintSummary:
+        summary = self.summaries.get(name)
+        if summary is None:
+            summary = self.summaries[name] = self.load_summary(name)
+        return summary
+
+    def available(self, name: str) -> PrintSummary | None:
+        """Summarize a listed print, or else record why it cannot be, as `preload` does.
+
+        Such as a print directory which is created before its settings file.
+        """
+        if name not in self or name in self.errors:
+            return None
+
+        try:
+            return self.summarize(name)
+        except (OSError, RuntimeError, ValueError) as e:
+            log.error("Unable to load print '%s': %s", name, e)
+            self.errors[name] = e
+            return None
+
+    def load_summary(self, name: str) -> PrintSummary:
+        """Summarize a print from its fresh catalog entry, or else by loading it."""
+        print = self.prints.get(name)
+        if print is not None:
+            return PrintSummary.of_print(print)
+
+        try:
+            data = self.catalog.get(
+                name, (self.path / name / Print.SETTINGS_FILE).stat()
+            )
+        except FileNotFoundError:
+            data = None
+
+        if data is not None:
+            return PrintSummary.of_data(data)
+        return PrintSummary.of_print(self.load(name))
+
+    def files(self, name: str) -> list[PrintFile]:
+        return PrintFile.find(self.path / name)
+
+    @contextmanager
+    def lock(self, name: str) -> Iterator[None]:
+        """Hold a print's lock, which also keeps it from being evicted meanwhile."""
+        with self.write_lock:
+            lock = self.locks.get(name)
+            if lock is None:
+                lock = self.locks[name] = threading.RLock()
+            self.holders[name] = self.holders.get(name, 0) + 1
+
+        try:
+            with lock:
+                yield
+        finally:
+            with self.write_lock:
+                self.holders[name] -= 1
+                if not self.holders[name]:
+                    del self.holders[name]
+
+    def invalidate(self, *names: str):
+        """Drop the given loaded prints (or all of them), other than those pending a write."""
+        with self.write_lock:
+            for name in names or list(self.prints):
+                if name not in self.pending:
+                    self.prints.pop(name, None)
+
+            if names:
+                for name in names:
+                    self.summaries.pop(name, None)
+            else:
+                self.summaries = {}
 
     def refresh(self):
-        self.print_paths = {}
-        for child_path in self.path.iterdir():
-            if not child_path.is_dir():
+        if not self.listed:
+            self.catalog = Catalog.load(self.catalog_path)
+            self.listed = True
+
+        print_paths = {}
+        with os.scandir(self.path) as entries:
+            for entry in entries:
+                # Directory entries carry their type, so no `stat` is needed.
+                if entry.is_dir() and not entry.name.startswith("."):
+                    print_paths[entry.name] = Path(entry.path)
+
+        with self.write_lock:
+            self.print_paths = print_paths
+            self.catalog.prune(set(print_paths))
+            self.summaries = {
+                name: summary
+                for name, summary in self.summaries.items()
+                if name in print_paths
+            }
+            self.contributions = None
+            self.summary = None
+            self.order_indexes = None
+            self.generation += 1
+
+    def reload(self, name: str):
+        """Drop a single print, so it is re-collected on next access.
+
+        Handles print directories which have been added or removed since the
+        last `refresh`.
+        """
+        with self.lock(name), self.write_lock:
+            if name in self.pending:
+                # The in-memory print is newer than the file, and about to replace it.
+                return
+
+            self.prints.pop(name, None)
+            self.errors.pop(name, None)
+
+            path = self.path / name
+            if path.is_dir() and not name.startswith("."):
+                self.print_paths[name] = path
+            else:
+                self.print_paths.pop(name, None)
+                self.catalog.discard(name)
+
+            self.changed(name)
+
+    def preload(self, threads: int = 8) -> dict[str, Exception]:
+        """Summarize every print not already summarized, in bulk.
+
+        Reading the settings files is I/O bound (and slow on network storage),
+        so is spread over `threads`. Prints which fail to load are returned, and
+        skipped by iteration, rather than aborting the whole load.
+        """
+        if not self.listed:
+            self.refresh()
+
+        names = [
+            name
+            for name in self.names()
+            if name not in self.summaries
+            and name not in self.prints
+            and name not in self.errors
+        ]
+        with ThreadPoolExecutor(max_workers=threads) as executor:
+            reads = [executor.submit(self.read_settings, name) for name in names]
+
+        # Parsing and validating is CPU bound, so gains nothing from the threads.
+        errors: dict[str, Exception] = {}
+        adapter = type_adapter(Print)
+        for name, future in zip(names, reads):
+            try:
+                stat, content = future.result()
+                data = self.catalog.get(name, stat)
+                if data is not None:
+                    summary = PrintSummary.of_data(data)
+                else:
+                    print = adapter.validate_python(TOML.loads(content))
+                    self.catalog.record(name, stat, print.dump())
+                    summary = PrintSummary.of_print(print)
+            except (OSError, ValueError) as e:
+                errors[name] = e
                 continue
 
-            name = child_path.name
-            self.print_paths[name] = child_path
+            self.summaries[name] = summary
+
+        self.errors.update(errors)
+
+        if self.catalog.stale:
+            with self.write_lock:
+                self.catalog.write(self.catalog_path)
+        return errors
+
+    def read_settings(self, name: str) -> tuple[os.stat_result, bytes]:
+        # As in `load`, the file is `stat`-ed before it is read.
+        path = self.path / name / Print.SETTINGS_FILE
+        stat = path.stat()
+        if self.catalog.fresh(name, stat):
+            return stat, b""
+        return stat, path.read_bytes()
 
     def add(self, print: Print) -> Print:
         name = print.name
         path = self.path / name
         print.path = path
-        self.prints[name] = print
-        self.print_paths[name] = path
-        self.cached.add(name)
+        # Replaces whatever is already on disk, so is based upon its revision.
+        print.revision = print.read_revision()
+        with self.write_lock:
+            self.prints.pop(name, None)
+            self.evict(room=1)
+            self.prints[name] = print
+            self.print_paths[name] = path
+        self.changed(name)
         return print
 
     def get(self, name: str) -> Print | None:
@@ -90,8 +419,226 @@ class PrintStore:
 
         return self[name]
 
-    def write(self, name: str):
-        self.prints[name].write()
+    def select(
+        self,
+        order: OrderOptions,
+        direction: DirectionOptions,
+        filter: FilterOptions,
+        offset: int = 0,
+        limit: int | None = None,
+    ) -> list[PrintSummary]:
+        index = self.order_index(order, filter)
+        with self.write_lock:
+            names = index.slice(direction, offset, limit)
+        return [self.summarize(name) for name in names]
+
+    def order_index(self, order: OrderOptions, filter: FilterOptions) -> OrderIndex:
+        indexes = self.order_indexes
+        if indexes is None:
+            # Built aside, so that concurrent requests never see a partial index;
+            # and only kept if no print changed meanwhile, else it may be stale.
+            generation = self.generation
+            indexes = {
+                (o, f): OrderIndex()
+                for o in get_args(OrderOptions)
+                for f in get_args(FilterOptions)
+            }
+            for summary in self.listing():
+                for (o, f), index in indexes.items():
+                    if summary.matches(f):
+                        index.insert(summary.name, summary.order_key(o))
+
+            with self.write_lock:
+                if self.generation == generation:
+                    self.order_indexes = indexes
+
+        if order not in get_args(OrderOptions):
+            order = "name"
+        return indexes[order, filter or "all"]
+
+    def update_indexes(self, name: str):
+        """Move a single print to its sorted position in each (already built) index."""
+        if self.order_indexes is None:
+            return
+
+        summary = self.available(name)
+        for (order, filter), index in self.order_indexes.items():
+            if summary is not None and summary.matches(filter):
+                index.insert(name, summary.order_key(order))
+            else:
+                index.remove(name)
+
+    @property
+    def totals(self) -> Totals:
+        summary = self.summary
+        if summary is None or self.contributions is None:
+            # As with `order_index`, computed aside and only kept if still current.
+            generation = self.generation
+            contributions = {s.name: Totals.of_print(s) for s in self.listing()}
+            summary = sum(contributions.values(), start=Totals())
+
+            with self.write_lock:
+                if self.generation == generation:
+                    self.contributions = contributions
+                    self.summary = summary
+        return summary
+
+    def update_totals(self, name: str):
+        """Replace a single print's contribution to the (already computed) totals."""
+        if self.summary is None or self.contributions is None:
+            return
+
+        previous = self.contributions.pop(name, None)
+        if previous is not None:
+            self.summary -= previous
+
+        summary = self.available(name)
+        if summary is not None:
+            current = Totals.of_print(summary)
+            self.contributions[name] = current
+            self.summary += current
+
+    def edit_version(self, print: Print) -> str:
+        """Identify a print's content, so that edits based upon an older one are refused.
+
+        Its revision alone would not do, since several edits within the same
+        `write_delay` are flushed as a single revision. Being derived from the
+        content alone, it is the same in every process (and across restarts).
+        """
+        content = json.dumps(print.dump(), sort_keys=True).encode()
+        return hashlib.blake2b(content, digest_size=8).hexdigest()
+
+    def changed(self, name: str):
+        with self.write_lock:
+            self.generation += 1
+            self.summaries.pop(name, None)
+            self.update_totals(name)
+            self.update_indexes(name)
+
+    def write(self, *names: str):
+        """Record that the given (in-memory) prints have changed, and schedule their write.
+
+        Writes are deferred by `write_delay`, so that repeated writes of the same
+        print (e.g. successive clicks) are coalesced into a single `flush`.
+        """
+        with self.write_lock:
+            for name in names:
+                # Each flush advances a print by a single revision.
+                if name not in self.pending and name in self.prints:
+                    self.prints[name].revision += 1
+
+                self.pending.add(name)
+                self.changed(name)
+
+            if self.write_delay > 0 and self.flush_timer is None:
+                self.flush_timer = threading.Timer(self.write_delay, self.flush)
+                self.flush_timer.daemon = True
+                self.flush_timer.start()
+
+        if self.write_delay <= 0:
+            # Only the given prints, whose locks the caller may hold; waiting on
+            # any other print's lock could deadlock with its writer.
+            self.flush(*names)
+
+    def flush(self, *names: str):
+        """Write out pending prints, or only the given ones.
+
+        Each print is written under its lock, and remains pending until it has
+        been, so that a concurrent `reload` cannot discard it in the meantime.
+        """
+        with self.write_lock:
+            if not names:
+                if self.flush_timer is not None:
+                    self.flush_timer.cancel()
+                    self.flush_timer = None
+                names = tuple(self.pending)
+
+        written = False
+        for name in sorted(names):
+            with self.lock(name):
+                print = self.prints.get(name)
+                if name not in self.pending or print is None:
+                    continue
+
+                try:
+                    print.write(fsync=self.fsync, expected=print.revision - 1)
+                except StalePrintError as e:
+                    log.warning("%s, so the change to it was discarded", e)
+                    with self.write_lock:
+                        self.pending.discard(name)
+                        self.rejected.append(name)
+                    self.reload(name)
+                    continue
+                except OSError:
+                    log.exception("Unable to write %s, retrying on next flush", name)
+                    continue
+
+                stat = (print.path / print.SETTINGS_FILE).stat()
+                with self.write_lock:
+                    self.pending.discard(name)
+                    self.catalog.record(name, stat, print.dump())
+                written = True
+
+        # An unlisted store's catalog was never loaded, so would only clobber it.
+        if written and self.listed:
+            with self.write_lock:
+                self.catalog.write(self.catalog_path, fsync=self.fsync)
+
+        # Prints kept only for their pending writes can now be evicted.
+        self.evict()
+
+
+@dataclass(config=model_config)
+class Totals:
+    reference_cost: float = 0.0
+    weight: float = 0.0
+    cost: float = 0.0
+    print_time: TimeDelta = Field(default_factory=TimeDelta)
+    count: int = 0
+    printed_weight: float = 0.0
+    printed_cost: float = 0.0
+    saved: float = 0.0
+
+    @classmethod
+    def of_print(cls, print: Print | PrintSummary) -> Totals:
+        weight = print.weight
+        cost = print.cost
+        count = print.count
+        printed_cost = cost * count
+        return cls(
+            reference_cost=print.reference_cost,
+            weight=weight,
+            cost=cost,
+            print_time=print.duration,
+            count=count,
+            printed_weight=weight * count,
+            printed_cost=printed_cost,
+            saved=print.reference_cost * count - printed_cost,
+        )
+
+    def __add__(self, other: Totals) -> Totals:
+        return Totals(
+            reference_cost=self.reference_cost + other.reference_cost,
+            weight=self.weight + other.weight,
+            cost=self.cost + other.cost,
+            print_time=self.print_time + other.print_time,
+            count=self.count + other.count,
+            printed_weight=self.printed_weight + other.printed_weight,
+            printed_cost=self.printed_cost + other.printed_cost,
+            saved=self.saved + other.saved,
+        )
+
+    def __sub__(self, other: Totals) -> Totals:
+        return Totals(
+            reference_cost=self.reference_cost - other.reference_cost,
+            weight=self.weight - other.weight,
+            cost=self.cost - other.cost,
+            print_time=self.print_time - other.print_time,
+            count=self.count - other.count,
+            printed_weight=self.printed_weight - other.printed_weight,
+            printed_cost=self.printed_cost - other.printed_cost,
+            saved=self.saved - other.saved,
+        )
 
 
 @dataclass(config=model_config)
@@ -101,9 +648,16 @@ class State:
     prints: PrintStore
     investments: list[Investment] = Field(default_factory=list)
     materials: dict[str, Material] = Field(default_factory=dict)
+    meshes: MeshIndex | None = Field(default=None, exclude=True)
+
+    # Changes to investments/materials; see `generation`.
+    version: int = Field(default=0, exclude=True)
+    observed: tuple[int, float] = Field(default=(-1, 0.0), exclude=True)
 
     INVESTMENTS_FILE: ClassVar[PurePath] = PurePath("investments.toml")
     MATERIALS_FILE: ClassVar[PurePath] = PurePath("materials.toml")
+    CACHE_DIR: ClassVar[PurePath] = PurePath(".cache")
+    MESH_INDEX_FILE: ClassVar[PurePath] = PurePath("meshes.json")
 
     order_options: ClassVar[list[OrderOptions]] = [
         "created_at",
@@ -120,68 +674,207 @@ class State:
     def materials_path(cls, path: Path):
         return path / cls.MATERIALS_FILE
 
+    @classmethod
+    def cache_path(cls, path: Path):
+        return path / cls.CACHE_DIR
+
+    @property
+    def generation(self) -> int:
+        """A counter which increases with every change to the library's content."""
+        return self.version + self.prints.generation
+
+    @property
+    def last_modified(self) -> float:
+        """The time at which the current `generation` was first observed."""
+        generation = self.generation
+        if self.observed[0] != generation:
+            self.observed = (generation, time.time())
+        return self.observed[1]
+
+    @property
+    def mesh_index_path(self) -> Path:
+        return self.cache_path(self.path) / self.MESH_INDEX_FILE
+
+    @property
+    def mesh_index(self) -> MeshIndex:
+        if self.meshes is None:
+            self.meshes = MeshIndex.load(self.mesh_index_path)
+        return self.meshes
+
+    def analyze_meshes(self, workers: int | None = None) -> int:
+        """Record mesh statistics of every model file not yet in the mesh index."""
+        files = [
+            file.path
+            for summary in self.prints.listing()
+            for file in self.prints.files(summary.name)
+        ]
+
+        index = self.mesh_index
+        count = index.analyze(self.path, files, workers=workers)
+        index.prune(self.path, files)
+        if index.stale:
+            index.write(self.mesh_index_path)
+            # Pages show the stats (and weights estimated from them).
+            self.version += 1
+        return count
+
+    def mesh_stats(self, file: PrintFile) -> MeshStats | None:
+        return self.mesh_index.get(self.path, file.path)
+
+    def estimated_weight(self, print: Print | PrintSummary) -> float | None:
+        """Estimate a print's weight (in grams) from its models' volume.
+
+        The density is that of the first of the print's materials which has one.
+        """
+        densities = (
+            material.density
+            for name in print.material_names
+            if (material := self.find_material(name))
+        )
+        density = next((d for d in densities if d), None)
+        if density is None:
+            return None
+
+        # From the mesh index alone, since listings estimate every print shown.
+        stats = self.mesh_index.print_stats(print.name)
+        if not stats or any(s is None for s in stats):
+            return None
+        return sum(s.grams(density) for s in stats if s)
+
+    def model_files(self, print: Print | PrintSummary) -> list[str]:
+        """List the filenames of a print's model files, as of the last `analyze_meshes`."""
+        return self.mesh_index.models(print.name)
+
     def write_materials(self):
-        write_content(self.path, dict[str, Material], self.materials)
+        write_content(
+            self.materials_path(self.path),
+            dict[str, Material],
+            self.materials,
+            fsync=self.prints.fsync,
+        )
+        self.version += 1
 
     @classmethod
-    def collect_all(cls, path: Path):
-        return cls.collect(path, read_investments=True, read_materials=True)
+    def collect_all(
+        cls, path: Path, backend: Backend = "toml", fsync: FsyncPolicy = "file"
+    ):
+        return cls.collect(
+            path,
+            read_investments=True,
+            read_materials=True,
+            backend=backend,
+            fsync=fsync,
+        )
+
+    @classmethod
+    def read_investments(cls, path: Path) -> list[Investment]:
+        return get_content(
+            cls.investments_path(path),
+            dict[str, list[Investment]],
+            default={"investment": []},
+        )["investment"]
+
+    @classmethod
+    def read_materials(cls, path: Path) -> dict[str, Material]:
+        return get_content(
+            cls.materials_path(path),
+            dict[str, Material],
+            default={},
+        )
 
     @classmethod
     def collect(
-        cls, path: Path, read_investments: bool = False, read_materials: bool = False
+        cls,
+        path: Path,
+        read_investments: bool = False,
+        read_materials: bool = False,
+        backend: Backend = "toml",
+        fsync: FsyncPolicy = "file",
+        scan: bool = True,
     ):
         investments: list[Investment] = []
         if read_investments:
-            investments = get_content(
-                cls.investments_path(path),
-                dict[str, list[Investment]],
-                default={"investment": []},
-            )["investment"]
+            investments = cls.read_investments(path)
 
         materials = {}
         if read_materials:
-            materials = get_content(
-                cls.materials_path(path),
-                dict[str, Material],
-                default=materials,
-            )
+            materials = cls.read_materials(path)
+
+        prints: PrintStore
+        if backend == "sqlite":
+            from printed.database import SqlPrintStore
+
+            prints = SqlPrintStore.collect(path, scan=scan)
+        else:
+            prints = PrintStore.collect(path, scan=scan)
+        prints.fsync = fsync
 
         return cls(
             path=path,
             investments=investments,
             materials=materials,
-            prints=PrintStore.collect(path),
+            prints=prints,
         )
 
+    def flush(self):
+        """Write out any prints whose writes are still pending."""
+        self.prints.flush()
+
+    def reload(self, paths: Iterable[Path]) -> set[str]:
+        """Re-collect only the entries to which the given changed paths belong.
+
+        Returns the names of those entries.
+        """
+        root = self.path.absolute()
+
+        names: set[str] = set()
+        for path in paths:
+            try:
+                relative = path.absolute().relative_to(root)
+            except ValueError:
+                continue
+
+            if not relative.parts:
+                continue
+
+            names.add(relative.parts[0])
+
+        for name in names:
+            if name.startswith("."):
+                continue
+
+            if PurePath(name) == self.INVESTMENTS_FILE:
+                self.investments = self.read_investments(self.path)
+                self.version += 1
+            elif PurePath(name) == self.MATERIALS_FILE:
+                self.materials = self.read_materials(self.path)
+                self.version += 1
+            else:
+                self.prints.reload(name)
+        return names
+
     def get_prints(
         self,
         order: OrderOptions,
-        direction: Literal["asc", "desc"],
-        filter: Literal["all", "printed", "unprinted"],
+        direction: DirectionOptions,
+        filter: FilterOptions,
+        offset: int = 0,
+        limit: int | None = None,
     ):
-        def by(print: Print):
-            match order:
-                case "created_at":
-                    return print.created_at
-                case "count":
-                    return print.count
-                case "saved":
-                    return print.total_saved
-                case "name" | _:
-                    return print.title
-            assert_never(order)
+        return self.prints.select(order, direction, filter, offset, limit)
 
-        filtered_result = [
-            p
-            for p in self.prints
-            if (not filter or filter == "all")
-            or (filter == "printed" and p.count)
-            or (filter == "unprinted" and not p.count)
-        ]
+    def find_material(self, name: str | None) -> Material | None:
+        """Find a material by name, or by a slicer's (case-insensitive) filament type."""
+        if name is None:
+            return None
 
-        reverse = direction == "desc"
-        return sorted(filtered_result, key=by, reverse=reverse)
+        if material := self.materials.get(name):
+            return material
+
+        for material in self.materials.values():
+            if material.name.lower() == name.lower():
+                return material
+        return None
 
     def get_materials(
         self,
@@ -212,35 +905,35 @@ class State:
 
     @property
     def total_reference_cost(self) -> float:
-        return sum(p.reference_cost for p in self.prints)
+        return self.prints.totals.reference_cost
 
     @property
     def total_weight(self) -> float:
-        return sum(p.weight for p in self.prints)
+        return self.prints.totals.weight
 
     @property
     def total_cost(self) -> float:
-        return sum(p.cost for p in self.prints)
+        return self.prints.totals.cost
 
     @property
     def total_print_time(self) -> TimeDelta:
-        return sum((p.duration for p in self.prints), start=TimeDelta())
+        return self.prints.totals.print_time
 
     @property
     def total_count(self) -> int:
-        return sum(p.count for p in self.prints)
+        return self.prints.totals.count
 
     @property
     def total_printed_weight(self) -> float:
-        return sum(p.total_printed_weight for p in self.prints)
+        return self.prints.totals.printed_weight
 
     @property
     def total_printed_cost(self) -> float:
-        return sum(p.total_printed_cost for p in self.prints)
+        return self.prints.totals.printed_cost
 
     @property
     def total_saved(self) -> float:
-        return sum(p.total_saved for p in self.prints)
+        return self.prints.totals.saved
 
     @property
     def grand_total_saved(self) -> float:
@@ -264,9 +957,14 @@ class Print:
     materials: list[PrintMaterial] = Field(default_factory=list)
     history: list[PrintHistory] = Field(default_factory=list)
 
+    # Incremented by every write, so that a write based upon an outdated copy
+    # of the print is rejected, rather than overwriting the newer one.
+    revision: int = 0
+
     path: Path = Field(default=Path(), exclude=True)
 
     SETTINGS_FILE: ClassVar[PurePath] = PurePath("project.toml")
+    LOCK_FILE: ClassVar[PurePath] = PurePath(".project.lock")
 
     @field_validator("duration", mode="plain")
     @classmethod
@@ -327,17 +1025,46 @@ class Print:
     def total_saved(self):
         return self.total_reference_cost - self.total_printed_cost
 
+    @property
+    def material_names(self) -> tuple[str, ...]:
+        return tuple(pm.material for pm in self.materials)
+
     @property
     def files(self):
-        return [
-            PrintFile(path)
-            for path in self.path.iterdir()
-            if path.suffix.lower() in {".stl", ".3mf", ".obj"}
-        ]
+        return PrintFile.find(self.path)
+
+    def file(self, filename: str) -> PrintFile | None:
+        for file in self.files:
+            if file.filename == filename:
+                return file
+        return None
 
-    def write(self):
-        print(self.path, self.SETTINGS_FILE)
-        write_content(self.path / self.SETTINGS_FILE, Print, self)
+    def dump(self) -> dict:
+        return type_adapter(Print).dump_python(self, mode="json")
+
+    def read_revision(self) -> int:
+        try:
+            content = (self.path / self.SETTINGS_FILE).read_bytes()
+        except FileNotFoundError:
+            return 0
+        return TOML.loads(content).get("revision", 0)
+
+    def write(self, fsync: FsyncPolicy = "none", *, expected: int | None = None):
+        """Write the print, provided its file is still at the `expected` revision.
+
+        The check and write happen under an advisory lock, shared with any
+        other (cli or web) process writing the print.
+        """
+        self.path.mkdir(parents=True, exist_ok=True)
+        with file_lock(self.path / self.LOCK_FILE):
+            if expected is not None:
+                current = self.read_revision()
+                if current != expected:
+                    raise StalePrintError(self.name, expected, current)
+
+            write_content(
+                self.path / self.SETTINGS_FILE, Print, self, preserve=True, fsync=fsync
+            )
 
     def delete(self):
         return
@@ -353,6 +1080,23 @@ class Print:
         self.duration = parse_duration(duration)
         self.source_links = [Link(url=url, title=title) for url, title in source_links]
 
+    def ingest(self, metadata: SlicerMetadata, material: Material | None = None):
+        """Fill in the print's duration and material usage from sliced output."""
+        if metadata.duration:
+            self.duration = metadata.duration
+
+        if metadata.grams and material:
+            self.materials = [
+                pm for pm in self.materials if pm.material != material.name
+            ]
+            self.materials.append(
+                PrintMaterial(
+                    material=material.name,
+                    unit_count=round(metadata.grams, 2),
+                    price_per_unit=material.price_per_unit,
+                )
+            )
+
     def append_history(self):
         self.history.insert(0, PrintHistory())
         self.history.sort(key=lambda h: h.printed_on, reverse=True)
@@ -368,6 +1112,15 @@ class Print:
         self.source_links.pop(number - 1)
 
 
+class StalePrintError(Exception):
+    def __init__(self, name: str, expected: int, current: int):
+        super().__init__(
+            f"Print '{name}' was changed elsewhere (revision {current}, "
+            f"expected {expected})"
+        )
+        self.name = name
+
+
 @dataclass(config=model_config)
 class Link:
     url: str
@@ -388,27 +1141,70 @@ class Link:
 class PrintFile:
     path: Path
 
+    SUFFIXES: ClassVar[set[str]] = {".stl", ".3mf", ".obj"}
+
+    # Where slicers (Prusa/Orca, Bambu) store a rendered thumbnail in a 3MF.
+    EMBEDDED_THUMBNAILS: ClassVar[tuple[str, ...]] = (
+        "Metadata/thumbnail.png",
+        "Metadata/plate_1.png",
+    )
+
+    @classmethod
+    def is_model(cls, path: Path) -> bool:
+        return path.suffix.lower() in cls.SUFFIXES
+
+    @classmethod
+    def find(cls, path: Path) -> list[PrintFile]:
+        return [cls(file) for file in path.iterdir() if cls.is_model(file)]
+
     @property
     def filename(self) -> str:
         return self.path.name
 
-    def preview(self) -> str:
-        import trimesh
-        import trimesh.scene.lighting
-        import trimesh.viewer
+    def preview(self, triangles: int = 100_000) -> bytes:
+        """Render the model as a binary glTF, simplified to `triangles` faces."""
+        from printed.mesh import decimate, load_mesh, to_glb
+
+        mesh = load_mesh(self.path)
+        vertices, faces = decimate(mesh.vertices, mesh.faces, triangles)
+        return to_glb(vertices, faces)
+
+    def embedded_thumbnail(self) -> zipfile.ZipInfo | None:
+        """Find the thumbnail a slicer embedded in a 3MF archive, if any.
+
+        Only the archive's central directory is read, never the mesh.
+        """
+        if self.path.suffix.lower() != ".3mf":
+            return None
 
         try:
-            scene = cast(trimesh.Scene, trimesh.load(self.path, force="scene"))
-            result = trimesh.viewer.scene_to_html(scene)
-            result = result.replace(
-                "new THREE.DirectionalLight(0xffffff,1.75)",
-                "new THREE.DirectionalLight(0xffffff,20)",
-            )
-        except Exception as e:
-            log.info(e, exc_info=True)
-            return ""
-        else:
-            return result
+            with zipfile.ZipFile(self.path) as archive:
+                members = {info.filename.lower(): info for info in archive.infolist()}
+        except (OSError, zipfile.BadZipFile):
+            return None
+
+        for name in self.EMBEDDED_THUMBNAILS:
+            if info := members.get(name.lower()):
+                return info
+        return None
+
+    def read_member(
+        self, info: zipfile.ZipInfo, chunk_size: int = 64 * 1024
+    ) -> Iterator[bytes]:
+        with zipfile.ZipFile(self.path) as archive, archive.open(info) as f:
+            while chunk := f.read(chunk_size):
+                yield chunk
+
+    def thumbnail(self, size: int = 128) -> bytes:
+        """Render a `size` pixel square PNG of the model, without a GPU."""
+        from printed.mesh import decimate, encode_png, load_mesh, rasterize
+
+        if info := self.embedded_thumbnail():
+            return b"".join(self.read_member(info))
+
+        mesh = load_mesh(self.path)
+        vertices, faces = decimate(mesh.vertices, mesh.faces, size * size)
+        return encode_png(rasterize(vertices, faces, size))
 
 
 @dataclass(config=model_config)
@@ -446,6 +1242,7 @@ class Material:
     name: str
     unit: str
     price_per_unit: float = 0.0
+    density: float | None = None  # g/cm^3
 
     @classmethod
     def from_thousand(cls, name: str, unit: str, value: float, price: float) -> Self:
@@ -0,0 +1,169 @@
+from __future__ import annotations
+
+import mmap
+import re
+import zipfile
+from dataclasses import dataclass
+from pathlib import Path
+from typing import IO, ClassVar
+
+from whenever import TimeDelta
+
+# Slicers write their estimates as comments at the start (Cura, Bambu) or end
+# (PrusaSlicer, Orca, Simplify3D) of the file; the moves in between are never read.
+WINDOW = 256 * 1024
+
+DURATION_PATTERNS = [
+    re.compile(rb"^;\s*estimated printing time(?: \(normal mode\))?\s*=\s*(.+)$", re.M),
+    re.compile(rb";\s*total estimated time:\s*([^;\r\n]+)"),
+    re.compile(rb"^;\s*model printing time:\s*([^;\r\n]+)", re.M),
+    re.compile(rb"^;\s*Build time:\s*(.+)$", re.M),
+    re.compile(rb"^;TIME:(\d+)\s*$", re.M),
+]
+GRAMS_PATTERNS = [
+    re.compile(rb"^;\s*total filament used \[g\]\s*=\s*([\d.]+)", re.M),
+    re.compile(rb"^;\s*total filament weight \[g\]\s*:\s*([\d.]+)", re.M),
+    re.compile(rb"^;\s*filament used \[g\]\s*=\s*([\d., ]+)$", re.M),
+    re.compile(rb"^;\s*Plastic weights?:\s*([\d.]+)", re.M),
+]
+MATERIAL_PATTERNS = [
+    re.compile(rb"^;\s*filament_type\s*=\s*([^;\r\n]+)", re.M),
+    re.compile(rb"^;\s*filament_settings_id\s*=\s*([^\r\n]+)", re.M),
+]
+SLICE_INFO_PREDICTION = re.compile(rb'<metadata key="prediction" value="([\d.]+)"')
+SLICE_INFO_WEIGHT = re.compile(rb'<metadata key="weight" value="([\d.]+)"')
+SLICE_INFO_FILAMENT = re.compile(rb'<filament [^>]*type="([^"]+)"')
+DURATION_UNITS = re.compile(
+    r"(\d+(?:\.\d+)?)\s*(d|h|m|s|days?|hours?|minutes?|mins?|seconds?|secs?)(?![a-z])"
+)
+
+
+@dataclass
+class SlicerMetadata:
+    duration: TimeDelta | None = None
+    grams: float | None = None
+    material: str | None = None
+
+    GCODE_SUFFIXES: ClassVar[set[str]] = {".gcode", ".gco", ".bgcode"}
+
+    @classmethod
+    def read(cls, path: Path) -> SlicerMetadata:
+        suffix = path.suffix.lower()
+        if suffix == ".3mf":
+            return cls.from_3mf(path)
+        if suffix in cls.GCODE_SUFFIXES:
+            return cls.from_gcode(path)
+        return cls()
+
+    @classmethod
+    def from_gcode(cls, path: Path) -> SlicerMetadata:
+        with path.open("rb") as f:
+            return cls.from_file(f)
+
+    @classmethod
+    def from_file(cls, f: IO[bytes]) -> SlicerMetadata:
+        """Scan only the leading and trailing comment blocks of a G-code file.
+
+        The file is mapped rather than read, so that only the pages which are
+        actually scanned are loaded, however large the file.
+        """
+        try:
+            content = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        except ValueError:
+            # Empty files cannot be mapped.
+            return cls()
+
+        with content:
+            size = len(content)
+            head = content[:WINDOW]
+            tail = content[max(size - WINDOW, WINDOW) :]
+        return cls.parse(head, tail)
+
+    @classmethod
+    def from_3mf(cls, path: Path) -> SlicerMetadata:
+        with zipfile.ZipFile(path) as archive:
+            names = {name.lower(): name for name in archive.namelist()}
+
+            # Bambu/Orca record their estimates per plate.
+            if name := names.get("metadata/slice_info.config"):
+                result = cls.from_slice_info(archive.read(name))
+                if result.duration or result.grams:
+                    return result
+
+            # ".gcode.3mf" exports embed the sliced G-code itself.
+            gcode = [n for lower, n in names.items() if lower.endswith(".gcode")]
+            if gcode:
+                with archive.open(gcode[0]) as f:
+                    head = f.read(WINDOW)
+                    size = archive.getinfo(gcode[0]).file_size
+                    f.seek(max(size - WINDOW, len(head)))
+                    tail = f.read()
+                return cls.parse(head, tail)
+
+            # An unsliced project only knows the chosen material.
+            for config in (
+                "metadata/slic3r_pe.config",
+                "metadata/project_settings.config",
+            ):
+                if name := names.get(config):
+                    return cls.parse(archive.read(name), b"")
+
+        return cls()
+
+    @classmethod
+    def from_slice_info(cls, content: bytes) -> SlicerMetadata:
+        # A flat list of `<metadata key=".." value=".."/>` per plate, so it is
+        # matched directly rather than handing (uploaded) XML to a parser.
+        seconds = sum(float(v) for v in SLICE_INFO_PREDICTION.findall(content))
+        grams = sum(float(v) for v in SLICE_INFO_WEIGHT.findall(content))
+        material = SLICE_INFO_FILAMENT.search(content)
+
+        return cls(
+            duration=TimeDelta(seconds=round(seconds)) if seconds else None,
+            grams=grams or None,
+            material=material.group(1).decode("utf-8", "replace") if material else None,
+        )
+
+    @classmethod
+    def parse(cls, head: bytes, tail: bytes) -> SlicerMetadata:
+        # The trailer is searched first: it is written once slicing finishes,
+        # so it takes precedence over any header values.
+        blocks = [tail, head]
+
+        duration = None
+        if match := search(DURATION_PATTERNS, blocks):
+            duration = parse_duration(match.decode("utf-8", "replace"))
+
+        grams = None
+        if match := search(GRAMS_PATTERNS, blocks):
+            # Multi-extruder prints list a value per filament.
+            values = re.split(rb"[,\s]+", match.strip())
+            grams = sum(float(v) for v in values if v) or None
+
+        material = None
+        if match := search(MATERIAL_PATTERNS, blocks):
+            material = match.decode("utf-8", "replace").split(";")[0].strip(' "')
+
+        return cls(duration=duration, grams=grams, material=material or None)
+
+
+def search(patterns: list[re.Pattern[bytes]], blocks: list[bytes]) -> bytes | None:
+    for pattern in patterns:
+        for block in blocks:
+            if match := pattern.search(block):
+                return match.group(1).strip()
+    return None
+
+
+def parse_duration(value: str) -> TimeDelta | None:
+    """Parse slicer durations, such as "1d 2h 3m 4s", "1 hours 2 minutes" or "3600"."""
+    value = value.strip()
+    if value.isdigit():
+        return TimeDelta(seconds=int(value))
+
+    seconds = 0.0
+    for amount, unit in DURATION_UNITS.findall(value):
+        factor = {"d": 86400, "h": 3600, "m": 60, "s": 1}[unit[0]]
+        seconds += float(amount) * factor
+
+    return TimeDelta(seconds=round(seconds)) if seconds else None
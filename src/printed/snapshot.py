@@ -0,0 +1,372 @@
+from __future__ import annotations
+
+import json
+import mmap
+import os
+import struct
+import time
+from array import array
+from collections.abc import Iterable, Iterator
+from pathlib import Path, PurePath
+from typing import Any, ClassVar, get_args
+
+from pydantic import Field
+from pydantic.dataclasses import dataclass
+from whenever import OffsetDateTime, TimeDelta
+
+from printed.path import atomic_write, type_adapter
+from printed.schema import (
+    DirectionOptions,
+    FilterOptions,
+    Investment,
+    Material,
+    OrderOptions,
+    Print,
+    PrintStore,
+    State,
+    Totals,
+    model_config,
+)
+from printed.summary import PrintSummary
+
+MAGIC = b"PRSNAP01"
+# The magic, the meta's length, and the offsets of the row offsets, the rows
+# themselves, and the order indexes.
+HEADER = struct.Struct("=8sQQQQ")
+
+
+def encode_row(summary: PrintSummary) -> bytes:
+    row = [
+        summary.name,
+        summary.title,
+        summary.created_at.format_common_iso(),
+        summary.count,
+        summary.reference_cost,
+        summary.weight,
+        summary.cost,
+        summary.duration.in_seconds(),
+        summary.source_links,
+        summary.material_names,
+    ]
+    return json.dumps(row, separators=(",", ":")).encode()
+
+
+def decode_row(content: bytes) -> PrintSummary:
+    row = json.loads(content)
+    return PrintSummary(
+        name=row[0],
+        title=row[1],
+        created_at=OffsetDateTime.parse_common_iso(row[2]),
+        count=row[3],
+        reference_cost=row[4],
+        weight=row[5],
+        cost=row[6],
+        duration=TimeDelta(seconds=row[7]),
+        source_links=tuple((url, title) for url, title in row[8]),
+        material_names=tuple(row[9]),
+    )
+
+
+def aligned(size: int, alignment: int = 8) -> int:
+    return size + -size % alignment
+
+
+@dataclass
+class SnapshotWriter:
+    """Publishes the library, as loaded by a single process, for web workers to map.
+
+    The snapshot holds every print's summary as a row, sorted by name, and for
+    each listing order and filter, the row numbers in that order; so a worker
+    only ever decodes the rows of the page it renders.
+    """
+
+    path: Path
+    generation: int = 0
+    # Distinguishes this writer's generations from those of earlier loaders.
+    token: str = Field(default_factory=lambda: f"{os.getpid():x}.{time.time_ns():x}")
+
+    def publish(self, state: State, changed: Iterable[str] = ()):
+        store = state.prints
+        summaries = sorted(store.listing(), key=lambda s: s.name)
+        numbers = {summary.name: number for number, summary in enumerate(summaries)}
+
+        rows = bytearray()
+        offsets = array("Q", [0])
+        for summary in summaries:
+            rows += encode_row(summary)
+            offsets.append(len(rows))
+
+        indexes = bytearray()
+        index_ranges = {}
+        for order in get_args(OrderOptions):
+            for filter in get_args(FilterOptions):
+                names = store.order_index(order, filter).slice("asc")
+                index = array("I", [numbers[name] for name in names if name in numbers])
+                index_ranges[f"{order}:{filter}"] = (len(indexes), len(index))
+                indexes += index.tobytes()
+
+        totals = store.totals
+        self.generation += 1
+        meta = {
+            "generation": self.generation,
+            "token": self.token,
+            "changed": sorted(changed),
+            "count": len(summaries),
+            "totals": {
+                "reference_cost": totals.reference_cost,
+                "weight": totals.weight,
+                "cost": totals.cost,
+                "print_time": totals.print_time.in_seconds(),
+                "count": totals.count,
+                "printed_weight": totals.printed_weight,
+                "printed_cost": totals.printed_cost,
+                "saved": totals.saved,
+            },
+            "investments": type_adapter(list[Investment]).dump_python(
+                state.investments, mode="json"
+            ),
+            "materials": type_adapter(dict[str, Material]).dump_python(
+                state.materials, mode="json"
+            ),
+            "indexes": index_ranges,
+        }
+        encoded_meta = json.dumps(meta, separators=(",", ":")).encode()
+
+        offsets_start = aligned(HEADER.size + len(encoded_meta))
+        rows_start = offsets_start + len(offsets) * offsets.itemsize
+        indexes_start = aligned(rows_start + len(rows))
+
+        content = bytearray(
+            HEADER.pack(
+                MAGIC, len(encoded_meta), offsets_start, rows_start, indexes_start
+            )
+        )
+        content += encoded_meta
+        content += bytes(offsets_start - len(content))
+        content += offsets.tobytes()
+        content += rows
+        content += bytes(indexes_start - len(content))
+        content += indexes
+
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        atomic_write(self.path, bytes(content))
+
+
+@dataclass(config=model_config)
+class Snapshot:
+    """A published snapshot, mapped read-only.
+
+    Each new snapshot replaces the file, rather than rewriting it, so a mapped
+    snapshot never changes underneath its readers.
+    """
+
+    path: Path
+    stat: os.stat_result
+    view: memoryview
+    meta: dict[str, Any]
+    offsets: memoryview
+    rows_start: int
+    indexes_start: int
+
+    @classmethod
+    def open(cls, path: Path) -> Snapshot:
+        with path.open("rb") as f:
+            stat = os.fstat(f.fileno())
+            view = memoryview(mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ))
+
+        magic, meta_size, offsets_start, rows_start, indexes_start = HEADER.unpack_from(
+            view
+        )
+        if magic != MAGIC:
+            raise ValueError(f"{path} is not a snapshot.")
+
+        return cls(
+            path=path,
+            stat=stat,
+            view=view,
+            meta=json.loads(bytes(view[HEADER.size : HEADER.size + meta_size])),
+            offsets=view[offsets_start:rows_start].cast("Q"),
+            rows_start=rows_start,
+            indexes_start=indexes_start,
+        )
+
+    def replaced(self) -> bool:
+        try:
+            stat = self.path.stat()
+        except FileNotFoundError:
+            return False
+        return (stat.st_dev, stat.st_ino) != (self.stat.st_dev, self.stat.st_ino)
+
+    def __len__(self) -> int:
+        return self.meta["count"]
+
+    def row(self, number: int) -> PrintSummary:
+        start = self.rows_start + self.offsets[number]
+        stop = self.rows_start + self.offsets[number + 1]
+        return decode_row(bytes(self.view[start:stop]))
+
+    def find(self, name: str) -> PrintSummary | None:
+        low, high = 0, len(self)
+        while low < high:
+            middle = (low + high) // 2
+            summary = self.row(middle)
+            if summary.name == name:
+                return summary
+            if summary.name < name:
+                low = middle + 1
+            else:
+                high = middle
+        return None
+
+    def index(self, order: OrderOptions, filter: FilterOptions) -> memoryview:
+        start, length = self.meta["indexes"][f"{order}:{filter}"]
+        start += self.indexes_start
+        return self.view[start : start + length * 4].cast("I")
+
+
+@dataclass(config=model_config)
+class SnapshotPrintStore(PrintStore):
+    """A web worker's store, which lists prints from the loader's snapshot.
+
+    Prints are still loaded in full from their own files, for their pages and
+    edits, and written as by any other store.
+    """
+
+    snapshot: Snapshot | None = None
+    # The state's generation once synced with `snapshot`; see `shared_generation`.
+    synced: int | None = None
+
+    SNAPSHOT_FILE: ClassVar[PurePath] = PurePath("snapshot.bin")
+
+    @classmethod
+    def collect(cls, path: Path, scan: bool = True):
+        # The library is listed by the loader, never by the workers.
+        return cls(path=path)
+
+    @classmethod
+    def snapshot_path(cls, path: Path) -> Path:
+        return State.cache_path(path) / cls.SNAPSHOT_FILE
+
+    @property
+    def current(self) -> Snapshot:
+        if self.snapshot is None:
+            self.poll()
+        assert self.snapshot
+        return self.snapshot
+
+    def poll(self) -> dict[str, Any] | None:
+        """Swap to a newly published snapshot, returning its meta if there was one."""
+        snapshot = self.snapshot
+        if snapshot is not None and not snapshot.replaced():
+            return None
+
+        with self.write_lock:
+            if self.snapshot is not snapshot:
+                return None
+
+            latest = Snapshot.open(self.snapshot_path(self.path))
+
+            # Loaded prints are dropped once changed elsewhere; if any snapshot was
+            # missed, it's unknown which were, so all of them are.
+            generation = latest.meta["generation"]
+            if snapshot is not None and generation == snapshot.meta["generation"] + 1:
+                self.invalidate(*latest.meta["changed"])
+            else:
+                self.invalidate()
+
+            self.snapshot = latest
+            self.summary = None
+            self.generation += 1
+            return latest.meta
+
+    def __iter__(self) -> Iterator[Print]:
+        for summary in self.listing():
+            yield self[summary.name]
+
+    def listing(self) -> Iterator[PrintSummary]:
+        snapshot = self.current
+        for number in range(len(snapshot)):
+            yield snapshot.row(number)
+
+    def summarize(self, name: str) -> PrintSummary:
+        # A loaded print is never older than the snapshot, which drops those it changes.
+        print = self.prints.get(name)
+        if print is None:
+            summary = self.current.find(name)
+            if summary is not None:
+                return summary
+            print = self[name]
+        return PrintSummary.of_print(print)
+
+    def preload(self, threads: int = 8) -> dict[str, Exception]:
+        # The loader loads the library (and reports what it cannot).
+        return {}
+
+    def select(
+        self,
+        order: OrderOptions,
+        direction: DirectionOptions,
+        filter: FilterOptions,
+        offset: int = 0,
+        limit: int | None = None,
+    ) -> list[PrintSummary]:
+        snapshot = self.current
+        if order not in get_args(OrderOptions):
+            order = "name"
+        index = snapshot.index(order, filter or "all")
+
+        size = len(index)
+        start = min(offset, size)
+        stop = size if limit is None else min(size, start + limit)
+        if direction == "desc":
+            numbers = index[size - stop : size - start][::-1]
+        else:
+            numbers = index[start:stop]
+
+        result = []
+        for number in numbers:
+            summary = snapshot.row(number)
+            print = self.prints.get(summary.name)
+            result.append(summary if print is None else PrintSummary.of_print(print))
+        return result
+
+    @property
+    def totals(self) -> Totals:
+        if self.summary is None:
+            totals = dict(self.current.meta["totals"])
+            totals["print_time"] = TimeDelta(seconds=totals["print_time"])
+            self.summary = Totals(**totals)
+        return self.summary
+
+
+def sync(state: State):
+    """Bring a worker's state up to date with the latest published snapshot."""
+    assert isinstance(state.prints, SnapshotPrintStore)
+    meta = state.prints.poll()
+    if meta is None:
+        return
+
+    state.investments = type_adapter(list[Investment]).validate_python(
+        meta["investments"]
+    )
+    state.materials = type_adapter(dict[str, Material]).validate_python(
+        meta["materials"]
+    )
+    state.meshes = None
+    state.version += 1
+    state.prints.synced = state.generation
+
+
+def shared_generation(state: State) -> str | None:
+    """Identify a worker's state as that of the snapshot, unless it has changed since.
+
+    Which is the same in every worker, so that their pages' ETags agree.
+    """
+    prints = state.prints
+    if not isinstance(prints, SnapshotPrintStore) or prints.snapshot is None:
+        return None
+    if state.generation != prints.synced:
+        return None
+
+    meta = prints.snapshot.meta
+    return f"{meta['token']}.{meta['generation']}"
@@ -0,0 +1,38 @@
+from typing import Annotated
+
+import cappa
+
+from printed.cli.base import Printed, StorageExport, StorageImport, console
+from printed.console import Console
+from printed.database import SqlPrintStore
+from printed.schema import PrintStore
+
+
+def copy_prints(source: PrintStore, target: PrintStore) -> int:
+    names = [target.add(print).name for print in source]
+    target.write(*names)
+    return len(names)
+
+
+def import_prints(
+    printed: Printed,
+    console: Annotated[Console, cappa.Dep(console)],
+    _: StorageImport,
+):
+    source = PrintStore.collect(printed.path)
+    target = SqlPrintStore.collect(printed.path)
+
+    count = copy_prints(source, target)
+    console.info(f"Imported {count} prints into {target.DATABASE_FILE}.")
+
+
+def export_prints(
+    printed: Printed,
+    console: Annotated[Console, cappa.Dep(console)],
+    _: StorageExport,
+):
+    source = SqlPrintStore.collect(printed.path)
+    target = PrintStore.collect(printed.path)
+
+    count = copy_prints(source, target)
+    console.info(f"Exported {count} prints from {source.DATABASE_FILE}.")
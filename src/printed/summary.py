@@ -0,0 +1,92 @@
+from __future__ import annotations
+
+from dataclasses import dataclass
+from typing import TYPE_CHECKING, Any, assert_never
+
+from whenever import OffsetDateTime, TimeDelta
+
+if TYPE_CHECKING:
+    from printed.schema import FilterOptions, OrderOptions, Print
+
+
+@dataclass(frozen=True, slots=True)
+class PrintSummary:
+    """The few columns of a print which listings show, sort and total by.
+
+    Kept for every print in the library, in place of the full `Print`, which is
+    only loaded once a single print is viewed or changed.
+    """
+
+    name: str
+    title: str
+    created_at: OffsetDateTime
+    count: int
+    reference_cost: float
+    weight: float
+    cost: float
+    duration: TimeDelta
+    source_links: tuple[tuple[str, str], ...]
+    material_names: tuple[str, ...]
+
+    @classmethod
+    def of_print(cls, print: Print) -> PrintSummary:
+        return cls(
+            name=print.name,
+            title=print.title,
+            created_at=print.created_at,
+            count=print.count,
+            reference_cost=print.reference_cost,
+            weight=print.weight,
+            cost=print.cost,
+            duration=print.duration,
+            source_links=tuple((link.url, link.title) for link in print.source_links),
+            material_names=tuple(pm.material for pm in print.materials),
+        )
+
+    @classmethod
+    def of_data(cls, data: dict[str, Any]) -> PrintSummary:
+        """Summarize an already validated (i.e. `Print.dump`-ed) print, without validating it again."""
+        materials = data.get("materials", [])
+        return cls(
+            name=data["name"],
+            title=data["title"],
+            created_at=OffsetDateTime.parse_common_iso(data["created_at"]),
+            count=len(data.get("history", [])),
+            reference_cost=data.get("reference_cost", 0.0),
+            weight=sum(pm["unit_count"] for pm in materials),
+            cost=sum(pm["unit_count"] * pm["price_per_unit"] for pm in materials),
+            duration=TimeDelta.parse_common_iso(data["duration"]),
+            source_links=tuple(
+                (link["url"], link["title"]) for link in data.get("source_links", [])
+            ),
+            material_names=tuple(pm["material"] for pm in materials),
+        )
+
+    @property
+    def total_printed_weight(self) -> float:
+        return self.weight * self.count
+
+    @property
+    def total_printed_cost(self) -> float:
+        return self.cost * self.count
+
+    @property
+    def total_saved(self) -> float:
+        return self.reference_cost * self.count - self.total_printed_cost
+
+    def order_key(self, order: OrderOptions):
+        match order:
+            case "created_at":
+                return self.created_at
+            case "count":
+                return self.count
+            case "saved":
+                return self.total_saved
+            case "name" | _:
+                return self.title
+        assert_never(order)
+
+    def matches(self, filter: FilterOptions) -> bool:
+        if filter == "all":
+            return True
+        return (filter == "printed") == bool(self.count)
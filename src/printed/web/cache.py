@@ -0,0 +1,77 @@
+from __future__ import annotations
+
+import threading
+import time
+from collections import OrderedDict
+from collections.abc import Callable, Hashable, Iterator
+from dataclasses import dataclass, field
+
+
+@dataclass
+class FragmentCache:
+    """Rendered template bytes, evicted least recently used first.
+
+    Keys include the state's generation, so entries are never invalidated;
+    once the library changes they simply stop being requested and age out.
+    Entries also expire after `ttl` seconds, since templates render relative
+    times ("2 hours ago").
+    """
+
+    max_size: int = 32 * 1024 * 1024
+    ttl: float = 300.0
+
+    entries: OrderedDict[Hashable, tuple[float, bytes]] = field(
+        default_factory=OrderedDict
+    )
+    size: int = 0
+    hits: int = 0
+    misses: int = 0
+
+    lock: threading.Lock = field(default_factory=threading.Lock, repr=False)
+    clock: Callable[[], float] = field(default=time.monotonic, repr=False)
+
+    def get(self, key: Hashable) -> bytes | None:
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is None or entry[0] < self.clock():
+                self.misses += 1
+                return None
+
+            self.entries.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+    def put(self, key: Hashable, content: bytes):
+        if len(content) > self.max_size:
+            return
+
+        with self.lock:
+            self.discard(key)
+            self.entries[key] = (self.clock() + self.ttl, content)
+            self.size += len(content)
+
+            while self.size > self.max_size:
+                _, (_, evicted) = self.entries.popitem(last=False)
+                self.size -= len(evicted)
+
+    def discard(self, key: Hashable):
+        entry = self.entries.pop(key, None)
+        if entry is not None:
+            self.size -= len(entry[1])
+
+    def tee(self, key: Hashable, content: Iterator[bytes]) -> Iterator[bytes]:
+        """Pass `content` through, caching it once it has been fully produced."""
+        chunks: list[bytes] | None = []
+        size = 0
+        for chunk in content:
+            yield chunk
+
+            if chunks is not None:
+                chunks.append(chunk)
+                size += len(chunk)
+                if size > self.max_size:
+                    chunks = None
+
+        # Responses which were abandoned part way never reach this point.
+        if chunks is not None:
+            self.put(key, b"".join(chunks))
@@ -6,7 +6,7 @@ from functools import cache
 from typing import Annotated
 
 from dataclass_settings import Env, load_settings
-from fastapi import Depends, Request
+from fastapi import Depends, Query, Request
 from fastapi.responses import RedirectResponse
 from fastapi.templating import Jinja2Templates
 from starlette.status import HTTP_303_SEE_OTHER
@@ -20,13 +20,32 @@ from printed.formatting import (
     format_weight,
     relative_datetime,
 )
+from printed.preview import PreviewCache, PreviewQueue
 from printed.schema import State
+from printed.snapshot import SnapshotPrintStore, sync
+from printed.web.cache import FragmentCache
 
 
 @dataclass(frozen=True)
 class Config:
     timezone: Annotated[str, Env("TIMEZONE")] = "UTC"
     cost_symbol: Annotated[str, Env("COST_SYMBOL")] = "$"
+    page_size: Annotated[int, Env("PAGE_SIZE")] = 100
+    preview_cache_size: Annotated[int, Env("PREVIEW_CACHE_SIZE")] = 512 * 1024 * 1024
+    preview_workers: Annotated[int, Env("PREVIEW_WORKERS")] = 2
+    preview_timeout: Annotated[float, Env("PREVIEW_TIMEOUT")] = 60.0
+    preview_triangles: Annotated[int, Env("PREVIEW_TRIANGLES")] = 100_000
+    thumbnail_size: Annotated[int, Env("THUMBNAIL_SIZE")] = 128
+    fragment_cache_size: Annotated[int, Env("FRAGMENT_CACHE_SIZE")] = 32 * 1024 * 1024
+    write_delay: Annotated[float, Env("WRITE_DELAY")] = 0.5
+    # In prints, rather than bytes; listings never load prints in full.
+    print_cache_size: Annotated[int, Env("PRINT_CACHE_SIZE")] = 1000
+    load_threads: Annotated[int, Env("LOAD_THREADS")] = 8
+    # Changes are applied once none have been seen for `watch_step` seconds,
+    # or at most `watch_debounce` seconds after the first.
+    watch_step: Annotated[float, Env("WATCH_STEP")] = 0.2
+    watch_debounce: Annotated[float, Env("WATCH_DEBOUNCE")] = 1.6
+    watch_patterns: Annotated[str, Env("WATCH_PATTERNS")] = "*.toml"
 
 
 @cache
@@ -34,12 +53,53 @@ def config():
     return load_settings(Config)
 
 
+MAX_PAGE_SIZE = 1000
+
+
+@dataclass(frozen=True)
+class Page:
+    cursor: int
+    limit: int
+
+
+def page(
+    config: Annotated[Config, Depends(config)],
+    cursor: Annotated[int, Query(ge=0)] = 0,
+    limit: Annotated[int | None, Query(ge=1, le=MAX_PAGE_SIZE)] = None,
+) -> Page:
+    return Page(cursor=cursor, limit=limit or config.page_size)
+
+
 def printed(request: Request) -> base.Printed:
     return request.app.extra["command"]
 
 
 def state(request: Request) -> State:
-    return request.app.extra["state"]
+    state = request.app.extra["state"]
+    if isinstance(state.prints, SnapshotPrintStore):
+        # Picks up whatever the loader has published since the last request.
+        sync(state)
+    return state
+
+
+def fragments(request: Request) -> FragmentCache:
+    return request.app.extra["fragments"]
+
+
+def previews(request: Request) -> PreviewCache:
+    return request.app.extra["previews"]
+
+
+def preview_queue(request: Request) -> PreviewQueue:
+    return request.app.extra["preview_queue"]
+
+
+def thumbnails(request: Request) -> PreviewCache:
+    return request.app.extra["thumbnails"]
+
+
+def thumbnail_queue(request: Request) -> PreviewQueue:
+    return request.app.extra["thumbnail_queue"]
 
 
 def console(
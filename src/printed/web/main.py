@@ -1,21 +1,37 @@
 import asyncio
+import fnmatch
+import functools
 import importlib.resources
 import logging
+from collections.abc import Iterable
 from contextlib import asynccontextmanager
+from pathlib import Path
 
 from fastapi import FastAPI
 from fastapi.staticfiles import StaticFiles
-from watchfiles import awatch
+from watchfiles import Change, DefaultFilter, awatch
 
 from printed.cli.base import Printed
-from printed.schema import State
+from printed.path import written
+from printed.preview import (
+    PreviewCache,
+    PreviewQueue,
+    render_preview,
+    render_thumbnail,
+)
+from printed.schema import PrintFile, State
+from printed.snapshot import SnapshotPrintStore, SnapshotWriter, sync
+from printed.web.cache import FragmentCache
+from printed.web.dependencies import config
 from printed.web.routes import routes
 
+log = logging.getLogger(__name__)
 
-def create_app(command: Printed, routes=routes):
+
+def create_app(command: Printed, routes=routes, worker: bool = False):
     logging.basicConfig(level="INFO")
 
-    app = FastAPI(command=command, lifespan=lifespan)
+    app = FastAPI(command=command, lifespan=worker_lifespan if worker else lifespan)
 
     static_dir = importlib.resources.files("printed.web.static")
     app.mount("/static", StaticFiles(directory=str(static_dir)), name="static")
@@ -33,12 +49,241 @@ def create_app(command: Printed, routes=routes):
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     printed = app.extra["command"]
+    settings = config()
+
+    app.extra["state"] = state = State.collect_all(
+        printed.path, backend=printed.backend, fsync=printed.fsync
+    )
+    state.prints.write_delay = settings.write_delay
+    state.prints.max_prints = settings.print_cache_size
+    errors = await asyncio.to_thread(state.prints.preload, settings.load_threads)
+    for name, error in errors.items():
+        log.error("Unable to load print '%s': %s", name, error)
+
+    # When serving through workers, this process is only their loader.
+    publisher: SnapshotWriter | None = app.extra.get("publisher")
+    if publisher:
+        await asyncio.to_thread(publisher.publish, state)
+
+    start_services(app, State.cache_path(printed.path))
+    preview_queue: PreviewQueue = app.extra["preview_queue"]
+    thumbnail_queue: PreviewQueue = app.extra["thumbnail_queue"]
+
+    # Workers' previews are rendered by this process' queues alone.
+    forwards = []
+    if publisher:
+        forwards = [
+            asyncio.create_task(preview_queue.forward()),
+            asyncio.create_task(thumbnail_queue.forward()),
+        ]
+
+    app.extra["render_thumbnails"] = batch = asyncio.create_task(
+        render_thumbnails(state, thumbnail_queue)
+    )
+    app.extra["mesh_lock"] = asyncio.Lock()
+    app.extra["analyze_meshes"] = asyncio.create_task(analyze_meshes(app))
 
-    app.extra["state"] = State.collect_all(printed.path)
-    app.extra["watch_files"] = asyncio.create_task(watch_files(app, printed))
+    app.extra["watch_files"] = watcher = asyncio.create_task(watch_files(app, printed))
     yield
 
+    watcher.cancel()
+    batch.cancel()
+    for forward in forwards:
+        forward.cancel()
+    app.extra["analyze_meshes"].cancel()
+    stop_services(app)
+
+
+@asynccontextmanager
+async def worker_lifespan(app: FastAPI):
+    """Serve a snapshot published by the loader; see `printed.web.workers`."""
+    printed = app.extra["command"]
+    settings = config()
+
+    prints = SnapshotPrintStore.collect(printed.path)
+    prints.fsync = printed.fsync
+    prints.write_delay = settings.write_delay
+    prints.max_prints = settings.print_cache_size
+    app.extra["state"] = state = State(path=printed.path, prints=prints)
+    sync(state)
+
+    start_services(app, State.cache_path(printed.path), remote=True)
+    yield
+    stop_services(app)
+
+
+def start_services(app: FastAPI, cache_path: Path, remote: bool = False):
+    """Set up the fragment cache, and the preview and thumbnail caches and queues.
+
+    A worker's queues are `remote`, so only the loader renders.
+    """
+    settings = config()
+    app.extra["fragments"] = FragmentCache(max_size=settings.fragment_cache_size)
+    app.extra["previews"] = previews = PreviewCache(
+        cache_path / "previews",
+        max_size=settings.preview_cache_size,
+        suffix=f".{settings.preview_triangles}.glb",
+    )
+    app.extra["preview_queue"] = preview_queue = PreviewQueue(
+        previews,
+        render=functools.partial(render_preview, triangles=settings.preview_triangles),
+        workers=settings.preview_workers,
+        timeout=settings.preview_timeout,
+        remote=remote,
+    )
+    app.extra["thumbnails"] = thumbnails = PreviewCache(
+        cache_path / "thumbnails",
+        max_size=settings.preview_cache_size,
+        suffix=f".{settings.thumbnail_size}.png",
+    )
+    app.extra["thumbnail_queue"] = thumbnail_queue = PreviewQueue(
+        thumbnails,
+        render=functools.partial(render_thumbnail, size=settings.thumbnail_size),
+        workers=settings.preview_workers,
+        timeout=settings.preview_timeout,
+        remote=remote,
+    )
+    if not remote:
+        preview_queue.start()
+        thumbnail_queue.start()
+
+
+def stop_services(app: FastAPI):
+    state: State = app.extra["state"]
+    fragments: FragmentCache = app.extra["fragments"]
+
+    app.extra["preview_queue"].shutdown()
+    app.extra["thumbnail_queue"].shutdown()
+    state.flush()
+    log.info("Fragment cache: %s hits, %s misses", fragments.hits, fragments.misses)
+    log.info(
+        "Print cache: %s hits, %s misses, %s evictions",
+        state.prints.hits,
+        state.prints.misses,
+        state.prints.evictions,
+    )
+
+
+class LibraryFilter(DefaultFilter):
+    """Pass only changes to the library's own files.
+
+    That is, top level entries (print directories, and the investments and
+    materials files), and files matching `patterns`. Hidden files, such as the
+    catalog, caches and in-progress writes, are never passed.
+    """
+
+    def __init__(self, root: Path, patterns: Iterable[str]):
+        self.root = root.absolute()
+        self.patterns = [p.strip() for p in patterns if p.strip()]
+        super().__init__()
+
+    def __call__(self, change: Change, path: str) -> bool:
+        file = Path(path)
+        try:
+            relative = file.absolute().relative_to(self.root)
+        except ValueError:
+            return False
+
+        if any(part.startswith(".") for part in relative.parts):
+            return False
+
+        if len(relative.parts) > 1 and not any(
+            fnmatch.fnmatch(file.name.lower(), p) for p in self.patterns
+        ):
+            return False
+        return super().__call__(change, path)
+
+
+def external_changes(changes: set[tuple[Change, str]]) -> set[tuple[Change, str]]:
+    """Drop the changes which are only this process' own writes."""
+    return {
+        (change, path)
+        for change, path in changes
+        if change == Change.deleted or not written.matches(Path(path))
+    }
+
 
 async def watch_files(app: FastAPI, printed: Printed):
-    async for changes in awatch(printed.path):
-        app.extra["state"] = State.collect_all(printed.path)
+    settings = config()
+    patterns = [
+        *settings.watch_patterns.split(","),
+        *(f"*{suffix}" for suffix in PrintFile.SUFFIXES),
+    ]
+    async for changes in awatch(
+        printed.path,
+        watch_filter=LibraryFilter(printed.path, patterns),
+        debounce=int(settings.watch_debounce * 1000),
+        step=int(settings.watch_step * 1000),
+    ):
+        # A single bad batch must not end the watcher, or nothing would be
+        # reloaded ever again.
+        try:
+            await apply_changes(app, changes)
+        except Exception:
+            log.exception("Unable to apply changes to the library")
+
+
+async def apply_changes(app: FastAPI, changes: set[tuple[Change, str]]):
+    changes = await asyncio.to_thread(external_changes, changes)
+    if not changes:
+        return
+
+    state: State = app.extra["state"]
+    names = await asyncio.to_thread(state.reload, [Path(path) for _, path in changes])
+
+    publisher: SnapshotWriter | None = app.extra.get("publisher")
+    if publisher:
+        await asyncio.to_thread(publisher.publish, state, names)
+
+    preview_queue: PreviewQueue = app.extra["preview_queue"]
+    thumbnail_queue: PreviewQueue = app.extra["thumbnail_queue"]
+    models_changed = False
+    for change, path in changes:
+        file = Path(path)
+        if not PrintFile.is_model(file):
+            continue
+
+        models_changed = True
+        if change != Change.deleted and file.is_file():
+            await preview_queue.submit(file)
+            await thumbnail_queue.submit(file)
+
+    if models_changed:
+        app.extra["analyze_meshes"] = asyncio.create_task(analyze_meshes(app))
+
+
+async def render_thumbnails(state: State, queue: PreviewQueue):
+    """Queue a thumbnail of every model file without one embedded.
+
+    Thumbnails are cheap enough to render up front for the whole library, so
+    that the index can show them as plain images. Finding the files lists every
+    print's directory (and opens every 3MF), so is done in a thread, in the
+    background, rather than holding up the first request.
+    """
+    files = await asyncio.to_thread(thumbnail_files, state)
+    await queue.submit_all(files)
+
+
+def thumbnail_files(state: State) -> list[Path]:
+    return [
+        file.path
+        for summary in state.prints.listing()
+        for file in state.prints.files(summary.name)
+        if not file.embedded_thumbnail()
+    ]
+
+
+async def analyze_meshes(app: FastAPI):
+    state: State = app.extra["state"]
+    async with app.extra["mesh_lock"]:
+        generation = state.generation
+        count = await asyncio.to_thread(
+            state.analyze_meshes, workers=config().preview_workers
+        )
+
+        # Workers reload the mesh index with each snapshot.
+        publisher: SnapshotWriter | None = app.extra.get("publisher")
+        if publisher and state.generation != generation:
+            await asyncio.to_thread(publisher.publish, state)
+    if count:
+        log.info("Analyzed %s model files", count)
@@ -1,28 +1,93 @@
-from typing import Annotated
+import hashlib
+import os
+import shutil
+import time
+import zipfile
+from collections.abc import Callable, Iterator
+from email.utils import formatdate
+from pathlib import Path
+from typing import Annotated, Any
 
-from fastapi import Depends, Form, Request
+from fastapi import Depends, File, Form, HTTPException, Request, Response, UploadFile
+from fastapi.responses import FileResponse, StreamingResponse
 from fastapi.templating import Jinja2Templates
+from starlette.concurrency import run_in_threadpool
 
 from printed import print as print_actions
 from printed.cli.base import PrintAdd
-from printed.schema import State
-from printed.web.dependencies import get_template, redirect_to, state, templates
+from printed.preview import PreviewCache, PreviewQueue
+from printed.schema import PrintFile, State
+from printed.slicer import SlicerMetadata
+from printed.snapshot import shared_generation
+from printed.web.cache import FragmentCache
+from printed.web.dependencies import (
+    Config,
+    Page,
+    config,
+    fragments,
+    get_template,
+    page,
+    preview_queue,
+    previews,
+    redirect_to,
+    state,
+    templates,
+    thumbnail_queue,
+    thumbnails,
+)
 
 
-def render(template: str):
+def no_context() -> dict[str, Any]:
+    return {}
+
+
+def render(template: str, context: Callable[..., dict[str, Any]] = no_context):
+    """Render `template`, with whatever (validated) variables `context` depends upon."""
+
     def template_response(
         request: Request,
         state: Annotated[State, Depends(state)],
         templates: Annotated[Jinja2Templates, Depends(templates)],
+        config: Annotated[Config, Depends(config)],
+        fragments: Annotated[FragmentCache, Depends(fragments)],
+        extra: Annotated[dict[str, Any], Depends(context)],
     ):
-        return templates.TemplateResponse(
-            request=request,
-            name=get_template(request, template),
-            context={
+        name = get_template(request, template)
+
+        headers = {
+            "ETag": render_etag(state, name, request, fragments.ttl),
+            "Last-Modified": formatdate(state.last_modified, usegmt=True),
+            "Cache-Control": "no-cache",
+            "Vary": "HX-Request, HX-Target",
+        }
+        if headers["ETag"] in request.headers.get("If-None-Match", ""):
+            return Response(status_code=304, headers=headers)
+
+        key = (
+            name,
+            str(request.base_url),
+            tuple(sorted(request.query_params.multi_items())),
+            tuple(sorted(request.path_params.items())),
+            state.generation,
+        )
+        cached = fragments.get(key)
+        if cached is not None:
+            return Response(cached, media_type="text/html", headers=headers)
+
+        content = templates.get_template(name).generate(
+            {
+                "request": request,
+                "config": config,
                 "state": state,
                 "query": request.query_params,
                 "path": request.path_params,
-            },
+                **extra,
+            }
+        )
+        return StreamingResponse(
+            fragments.tee(key, buffered(content)),
+            media_type="text/html",
+            headers=headers,
         )
 
     template_response.__name__ = template
@@ -30,6 +95,211 @@ def render(template: str):
     return template_response
 
 
+def index_context(page: Annotated[Page, Depends(page)]) -> dict[str, Any]:
+    return {"page": page}
+
+
+# Distinguishes this process' generations from those of earlier (or other)
+# processes, whose counters started over.
+PROCESS_TOKEN = f"{os.getpid():x}.{time.time_ns():x}"
+
+
+def render_etag(state: State, template: str, request: Request, ttl: float) -> str:
+    """Identify a rendering by everything it depends upon.
+
+    Templates include relative times ("2 hours ago"), which drift without
+    anything having changed; so, as cached fragments expire after `ttl`
+    seconds, the ETag changes every `ttl` seconds too.
+    """
+    key = "\n".join(
+        [
+            template,
+            str(sorted(request.query_params.multi_items())),
+            str(sorted(request.path_params.items())),
+        ]
+    )
+    digest = hashlib.blake2b(key.encode(), digest_size=8).hexdigest()
+
+    # Workers' generations are their own, but the snapshot's are shared by all.
+    generation = shared_generation(state) or f"{PROCESS_TOKEN}.{state.generation}"
+    period = int(time.time() // ttl)
+    return f'W/"{generation}.{period}.{digest}"'
+
+
+def buffered(content: Iterator[str], size: int = 16384) -> Iterator[bytes]:
+    """Coalesce the many small chunks produced by jinja into fewer, larger writes."""
+    buffer: list[str] = []
+    buffer_size = 0
+    for chunk in content:
+        buffer.append(chunk)
+        buffer_size += len(chunk)
+        if buffer_size >= size:
+            yield "".join(buffer).encode("utf-8")
+            buffer = []
+            buffer_size = 0
+
+    if buffer:
+        yield "".join(buffer).encode("utf-8")
+
+
+def find_file(state: State, name: str, filename: str) -> PrintFile:
+    # Loads the print, and lists its directory, so is run off the event loop.
+    print = state.prints.get(name)
+    file = print.file(filename) if print else None
+    if file is None:
+        raise HTTPException(status_code=404)
+    return file
+
+
+async def file_preview(
+    request: Request,
+    state: Annotated[State, Depends(state)],
+    previews: Annotated[PreviewCache, Depends(previews)],
+    preview_queue: Annotated[PreviewQueue, Depends(preview_queue)],
+    templates: Annotated[Jinja2Templates, Depends(templates)],
+    name: str,
+    filename: str,
+):
+    file = await run_in_threadpool(find_file, state, name, filename)
+    key = await run_in_threadpool(previews.key, file.path)
+    path = await run_in_threadpool(previews.get, key)
+
+    # HTMX requests the preview once it is scrolled into view. Until the
+    # background job has rendered it, a placeholder which polls is returned.
+    if request.headers.get("HX-Request"):
+        url = request.url_for("file_preview", name=name, filename=filename)
+
+        # A slicer's embedded thumbnail is shown in place of the model until
+        # it is clicked, so the mesh is only rendered once it is wanted.
+        embedded = None
+        if "render" in request.query_params:
+            url = url.include_query_params(render=1)
+        elif not path:
+            embedded = await run_in_threadpool(file.embedded_thumbnail)
+
+        if embedded is not None:
+            return templates.TemplateResponse(
+                request=request,
+                name="preview.html",
+                context={
+                    "status": "thumbnail",
+                    "url": url.include_query_params(render=1),
+                    "thumbnail_url": request.url_for(
+                        "file_thumbnail", name=name, filename=filename
+                    ),
+                },
+            )
+
+        status = "ready" if path else await preview_queue.submit(file.path, key)
+        return templates.TemplateResponse(
+            request=request,
+            name="preview.html",
+            context={"status": status, "url": url},
+        )
+
+    return await cached_response(
+        request, preview_queue, file.path, key, media_type="model/gltf-binary"
+    )
+
+
+async def file_thumbnail(
+    request: Request,
+    state: Annotated[State, Depends(state)],
+    thumbnails: Annotated[PreviewCache, Depends(thumbnails)],
+    thumbnail_queue: Annotated[PreviewQueue, Depends(thumbnail_queue)],
+    name: str,
+    filename: str,
+):
+    file = await run_in_threadpool(find_file, state, name, filename)
+    embedded = await run_in_threadpool(file.embedded_thumbnail)
+    if embedded:
+        return await embedded_response(request, file, embedded)
+
+    key = await run_in_threadpool(thumbnails.key, file.path)
+    return await cached_response(
+        request, thumbnail_queue, file.path, key, media_type="image/png"
+    )
+
+
+async def embedded_response(
+    request: Request, file: PrintFile, info: zipfile.ZipInfo
+) -> Response:
+    """Stream a member straight out of the archive, without extracting it."""
+    stat = await run_in_threadpool(file.path.stat)
+    etag = f'"{stat.st_mtime_ns}-{info.CRC:08x}"'
+    if etag in request.headers.get("If-None-Match", ""):
+        return Response(status_code=304, headers={"ETag": etag})
+
+    return StreamingResponse(
+        file.read_member(info),
+        media_type="image/png",
+        headers={
+            "ETag": etag,
+            "Cache-Control": "no-cache",
+            "Content-Length": str(info.file_size),
+        },
+    )
+
+
+async def cached_response(
+    request: Request, queue: PreviewQueue, file: Path, key: str, media_type: str
+) -> Response:
+    etag = f'"{key}"'
+    if etag in request.headers.get("If-None-Match", ""):
+        return Response(status_code=304, headers={"ETag": etag})
+
+    path = await run_in_threadpool(queue.cache.get, key)
+    if path is None:
+        await queue.submit(file, key)
+        raise HTTPException(status_code=404)
+
+    return FileResponse(
+        path,
+        media_type=media_type,
+        headers={"ETag": etag, "Cache-Control": "no-cache"},
+    )
+
+
+UPLOAD_SUFFIXES = PrintFile.SUFFIXES | SlicerMetadata.GCODE_SUFFIXES
+
+
+def upload_file(
+    request: Request,
+    state: Annotated[State, Depends(state)],
+    name: str,
+    file: Annotated[UploadFile, File()],
+):
+    print = state.prints.get(name)
+    filename = Path(file.filename or "").name
+    if print is None or not filename:
+        raise HTTPException(status_code=404)
+
+    # Only models and sliced output; never the print's own (settings, lock) files.
+    suffix = Path(filename).suffix.lower()
+    if filename.startswith(".") or suffix not in UPLOAD_SUFFIXES:
+        raise HTTPException(
+            status_code=415,
+            detail=f"Only {', '.join(sorted(UPLOAD_SUFFIXES))} files can be uploaded.",
+        )
+
+    # Sliced output can be hundreds of MB, so it is copied through in chunks,
+    # and only its comment blocks are then scanned for metadata.
+    target = print.path / filename
+    tmp_path = target.with_name(f".{filename}.upload")
+    # The sqlite backend keeps no directory for a print until it has files.
+    print.path.mkdir(parents=True, exist_ok=True)
+    try:
+        with tmp_path.open("wb") as f:
+            shutil.copyfileobj(file.file, f, 1024 * 1024)
+        os.replace(tmp_path, target)
+    except BaseException:
+        tmp_path.unlink(missing_ok=True)
+        raise
+
+    print_actions.ingest_file(state, print, target)
+    return redirect_to(request, "print", name=name)
+
+
 def delete_print(
     request: Request,
     state: Annotated[State, Depends(state)],
@@ -43,7 +313,7 @@ def delete_print(
     return redirect_to(request, "print", name=name)
 
 
-async def add_print(
+def add_print(
     request: Request,
     state: Annotated[State, Depends(state)],
     title: Annotated[str, Form()],
@@ -54,7 +324,7 @@ async def add_print(
     return redirect_to(request, "print", name=print.name)
 
 
-async def update_print(
+def update_print(
     request: Request,
     state: Annotated[State, Depends(state)],
     name: str,
@@ -66,16 +336,26 @@ async def update_print(
     ],
     reference_cost: Annotated[float, Form()] = 0.0,
     duration: Annotated[str, Form()] = "",
+    version: Annotated[str | None, Form()] = None,
 ):
-    print = state.prints.get(name)
-    if print:
-        source_links = list(zip(source_link_urls, source_link_titles))
-        print.update(
-            reference_cost=reference_cost,
-            duration=duration,
-            source_links=source_links,
-        )
-        print.write()
+    with state.prints.lock(name):
+        print = state.prints.get(name)
+        if print:
+            # The form replaces the print's fields wholesale, so is rejected if
+            # the print has been changed since the form was rendered.
+            if version is not None and version != state.prints.edit_version(print):
+                raise HTTPException(
+                    status_code=409,
+                    detail=f"{name} has been changed elsewhere, reload to edit it.",
+                )
+
+            source_links = list(zip(source_link_urls, source_link_titles))
+            print.update(
+                reference_cost=reference_cost,
+                duration=duration,
+                source_links=source_links,
+            )
+            state.prints.write(name)
 
     return redirect_to(request, "print", name=name)
 
@@ -83,10 +363,11 @@ async def update_print(
 def append_history(
     request: Request, state: Annotated[State, Depends(state)], name: str
 ):
-    print = state.prints.get(name)
-    if print:
-        print.append_history()
-        print.write()
+    with state.prints.lock(name):
+        print = state.prints.get(name)
+        if print:
+            print.append_history()
+            state.prints.write(name)
 
     return redirect_to(request, "print", name=name)
 
@@ -94,10 +375,11 @@ def append_history(
 def delete_history(
     request: Request, state: Annotated[State, Depends(state)], name: str, number: int
 ):
-    print = state.prints.get(name)
-    if print:
-        print.delete_history(number)
-        print.write()
+    with state.prints.lock(name):
+        print = state.prints.get(name)
+        if print:
+            print.delete_history(number)
+            state.prints.write(name)
 
     return redirect_to(request, "print", name=name)
 
@@ -105,10 +387,11 @@ def delete_history(
 def append_source_link(
     request: Request, state: Annotated[State, Depends(state)], name: str
 ):
-    print = state.prints.get(name)
-    if print:
-        print.append_source_link()
-        print.write()
+    with state.prints.lock(name):
+        print = state.prints.get(name)
+        if print:
+            print.append_source_link()
+            state.prints.write(name)
 
     return redirect_to(request, "print", name=name)
 
@@ -116,9 +399,10 @@ def append_source_link(
 def delete_source_link(
     request: Request, state: Annotated[State, Depends(state)], name: str, number: int
 ):
-    print = state.prints.get(name)
-    if print:
-        print.delete_source_link(number)
-        print.write()
+    with state.prints.lock(name):
+        print = state.prints.get(name)
+        if print:
+            print.delete_source_link(number)
+            state.prints.write(name)
 
     return redirect_to(request, "print", name=name)
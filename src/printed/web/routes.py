@@ -14,7 +14,7 @@ routes: list[Route] = [
     {
         "method": "GET",
         "path": "/",
-        "endpoint": prints.render("index"),
+        "endpoint": prints.render("index", context=prints.index_context),
     },
     {
         "method": "GET",
@@ -26,6 +26,21 @@ routes: list[Route] = [
         "path": "/print/{name}",
         "endpoint": prints.render("print"),
     },
+    {
+        "method": "POST",
+        "path": "/print/{name}/file",
+        "endpoint": prints.upload_file,
+    },
+    {
+        "method": "GET",
+        "path": "/print/{name}/file/{filename}/preview",
+        "endpoint": prints.file_preview,
+    },
+    {
+        "method": "GET",
+        "path": "/print/{name}/file/{filename}/thumbnail",
+        "endpoint": prints.file_thumbnail,
+    },
     {
         "method": "POST",
         "path": "/print",
@@ -0,0 +1,62 @@
+// Only print pages load the viewer, and they may be swapped in by htmx, which
+// leaves import maps unprocessed; so three.js is imported from a CDN which
+// rewrites its addons' bare "three" imports, to share the one instance.
+import * as THREE from "https://esm.sh/three@0.160.0";
+import { GLTFLoader } from "https://esm.sh/three@0.160.0/examples/jsm/loaders/GLTFLoader.js";
+import { OrbitControls } from "https://esm.sh/three@0.160.0/examples/jsm/controls/OrbitControls.js";
+
+// <model-preview src="..."> renders a (GLB) model preview, framed to fit.
+class ModelPreview extends HTMLElement {
+  connectedCallback() {
+    const width = this.clientWidth || 300;
+    const height = this.clientHeight || 300;
+
+    this.renderer = new THREE.WebGLRenderer({ antialias: true, alpha: true });
+    this.renderer.setPixelRatio(window.devicePixelRatio);
+    this.renderer.setSize(width, height);
+    this.appendChild(this.renderer.domElement);
+
+    const scene = new THREE.Scene();
+    scene.add(new THREE.HemisphereLight(0xffffff, 0x444444, 2));
+
+    const camera = new THREE.PerspectiveCamera(45, width / height, 0.1, 10000);
+    const light = new THREE.DirectionalLight(0xffffff, 2);
+    camera.add(light);
+    scene.add(camera);
+
+    const controls = new OrbitControls(camera, this.renderer.domElement);
+    controls.addEventListener("change", () =>
+      this.renderer.render(scene, camera),
+    );
+
+    new GLTFLoader().load(this.getAttribute("src"), (gltf) => {
+      const model = gltf.scene;
+      model.traverse((node) => {
+        if (node.isMesh) {
+          node.material = new THREE.MeshStandardMaterial({ color: 0x9aa4b1 });
+        }
+      });
+      scene.add(model);
+
+      const box = new THREE.Box3().setFromObject(model);
+      const center = box.getCenter(new THREE.Vector3());
+      const radius = box.getSize(new THREE.Vector3()).length() / 2 || 1;
+
+      camera.position.copy(center).add(new THREE.Vector3(1, 1, 1).multiplyScalar(radius * 1.5));
+      camera.near = radius / 100;
+      camera.far = radius * 100;
+      camera.updateProjectionMatrix();
+
+      controls.target.copy(center);
+      controls.update();
+      this.renderer.render(scene, camera);
+    });
+  }
+
+  disconnectedCallback() {
+    this.renderer?.dispose();
+    this.renderer?.domElement.remove();
+  }
+}
+
+customElements.define("model-preview", ModelPreview);
@@ -0,0 +1,62 @@
+from __future__ import annotations
+
+import asyncio
+import logging
+import os
+import threading
+from pathlib import Path
+from typing import cast
+
+import uvicorn
+from fastapi import FastAPI
+
+from printed.cli.base import Printed
+from printed.options import FsyncPolicy
+from printed.snapshot import SnapshotPrintStore, SnapshotWriter
+from printed.web import main
+
+
+def serve(command: Printed, workers: int, **options):
+    """Serve the app from several worker processes, which share a single loader.
+
+    The loader (this process) loads the library, watches its files, renders
+    thumbnails and analyzes meshes, as the single process app does; and after
+    every change, publishes a snapshot of the library for the workers to map.
+    Workers only load prints in full to show or edit them.
+    """
+    logging.basicConfig(level="INFO")
+
+    loader = FastAPI(
+        command=command,
+        publisher=SnapshotWriter(SnapshotPrintStore.snapshot_path(command.path)),
+    )
+    context = main.lifespan(loader)
+
+    # The first snapshot is published before any worker starts.
+    loop = asyncio.new_event_loop()
+    loop.run_until_complete(context.__aenter__())
+    thread = threading.Thread(target=loop.run_forever, daemon=True)
+    thread.start()
+
+    # Workers are spawned, so are configured through the environment.
+    os.environ["PRINTED_PATH"] = str(command.path.absolute())
+    os.environ["PRINTED_FSYNC"] = command.fsync
+    try:
+        uvicorn.run(
+            "printed.web.workers:create_app", factory=True, workers=workers, **options
+        )
+    finally:
+        asyncio.run_coroutine_threadsafe(
+            context.__aexit__(None, None, None), loop
+        ).result()
+        loop.call_soon_threadsafe(loop.stop)
+        thread.join()
+        loop.close()
+
+
+def create_app() -> FastAPI:
+    command = Printed(
+        path=Path(os.environ["PRINTED_PATH"]),
+        fsync=cast(FsyncPolicy, os.environ["PRINTED_FSYNC"]),
+    )
+    return main.create_app(command, worker=True)
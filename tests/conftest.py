@@ -12,6 +12,12 @@ def time(time_machine: TimeMachineFixture):
     yield
 
 
+@pytest.fixture
+def ticking(time_machine: TimeMachineFixture):
+    """Let time pass, for process pools, which time out their waits."""
+    time_machine.move_to(datetime(2020, 1, 1), tick=True)
+
+
 @pytest.fixture
 def console():
     return Console()
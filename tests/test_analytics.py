@@ -0,0 +1,56 @@
+import os
+
+import pytest
+import trimesh
+
+from printed.analytics import MeshIndex
+
+pytestmark = pytest.mark.usefixtures("ticking")
+
+
+def write_models(root):
+    (root / "foo").mkdir()
+    (root / "bar").mkdir()
+    trimesh.creation.box(extents=(10, 10, 10)).export(root / "foo" / "box.stl")
+    (root / "foo" / "broken.stl").write_bytes(b"not a mesh")
+    trimesh.creation.box(extents=(10, 20, 10)).export(root / "bar" / "box.stl")
+    return [
+        root / "foo" / "box.stl",
+        root / "foo" / "broken.stl",
+        root / "bar" / "box.stl",
+    ]
+
+
+def test_failures_are_not_retried(tmp_path):
+    files = write_models(tmp_path)
+    index = MeshIndex()
+    assert index.analyze(tmp_path, files, workers=1) == 3
+    assert index.get(tmp_path, files[0]).volume == 1000
+    assert index.get(tmp_path, files[1]) is None
+
+    index.write(tmp_path / "meshes.json")
+    index = MeshIndex.load(tmp_path / "meshes.json")
+    assert index.analyze(tmp_path, files, workers=1) == 0
+
+    # Until the file changes.
+    stat = files[1].stat()
+    os.utime(files[1], ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000))
+    assert index.analyze(tmp_path, files, workers=1) == 1
+
+    index.prune(tmp_path, [files[0], files[2]])
+    assert index.failed == set()
+
+
+def test_print_stats(tmp_path):
+    files = write_models(tmp_path)
+    index = MeshIndex()
+    index.analyze(tmp_path, files, workers=1)
+
+    assert index.models("foo") == ["box.stl", "broken.stl"]
+    assert [s and s.volume for s in index.print_stats("foo")] == [1000, None]
+    assert [s and s.volume for s in index.print_stats("bar")] == [2000]
+    assert index.print_stats("baz") == []
+
+    index.prune(tmp_path, files[:1])
+    assert index.models("foo") == ["box.stl"]
+    assert index.models("bar") == []
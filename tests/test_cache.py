@@ -0,0 +1,74 @@
+from printed.web.cache import FragmentCache
+
+
+class Clock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+def test_evicts_least_recently_used():
+    cache = FragmentCache(max_size=10, clock=Clock())
+    cache.put("a", b"aaa")
+    cache.put("b", b"bbb")
+    cache.put("c", b"ccc")
+    assert cache.get("a") == b"aaa"
+
+    # "b" is now the least recently used, so goes first.
+    cache.put("d", b"ddd")
+    assert list(cache.entries) == ["c", "a", "d"]
+    assert cache.get("b") is None
+    assert cache.size == 9
+
+    cache.put("e", b"eeeeee")
+    assert list(cache.entries) == ["d", "e"]
+    assert cache.size == 9
+
+
+def test_replacing_an_entry_keeps_size():
+    cache = FragmentCache(max_size=10, clock=Clock())
+    cache.put("a", b"aaa")
+    cache.put("a", b"aaaaa")
+    assert cache.get("a") == b"aaaaa"
+    assert cache.size == 5
+
+
+def test_oversized_content_is_not_cached():
+    cache = FragmentCache(max_size=4, clock=Clock())
+    cache.put("a", b"aaa")
+    cache.put("b", b"bbbbb")
+    assert cache.get("b") is None
+    assert cache.get("a") == b"aaa"
+
+    assert list(cache.tee("c", iter([b"cc", b"ccc"]))) == [b"cc", b"ccc"]
+    assert cache.get("c") is None
+
+
+def test_entries_expire():
+    clock = Clock()
+    cache = FragmentCache(ttl=300, clock=clock)
+    cache.put("a", b"aaa")
+
+    clock.now = 299
+    cache.put("b", b"bbb")
+    assert cache.get("a") == b"aaa"
+
+    clock.now = 301
+    assert cache.get("a") is None
+    assert cache.get("b") == b"bbb"
+    assert (cache.hits, cache.misses) == (2, 1)
+
+    clock.now = 600
+    assert cache.get("b") is None
+
+
+def test_tee_caches_complete_content():
+    cache = FragmentCache(clock=Clock())
+    content = cache.tee("a", iter([b"a", b"b"]))
+    assert next(content) == b"a"
+    assert cache.get("a") is None
+
+    assert list(content) == [b"b"]
+    assert cache.get("a") == b"ab"
@@ -0,0 +1,91 @@
+import os
+
+from printed.catalog import Catalog
+from printed.schema import Print, PrintStore
+
+
+def write_settings(tmp_path, content: str = 'name = "foo"\n'):
+    path = tmp_path / "project.toml"
+    path.write_text(content)
+    return path
+
+
+def test_fresh_until_changed(tmp_path):
+    path = write_settings(tmp_path)
+    catalog = Catalog()
+    catalog.record("foo", path.stat(), {"name": "foo"})
+
+    assert catalog.fresh("foo", path.stat())
+    assert catalog.get("foo", path.stat()) == {"name": "foo"}
+    assert catalog.get("bar", path.stat()) is None
+
+
+def test_stale_by_mtime(tmp_path):
+    path = write_settings(tmp_path)
+    stat = path.stat()
+    catalog = Catalog()
+    catalog.record("foo", stat, {"name": "foo"})
+
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000))
+    assert not catalog.fresh("foo", path.stat())
+    assert catalog.get("foo", path.stat()) is None
+
+
+def test_stale_by_size(tmp_path):
+    path = write_settings(tmp_path)
+    stat = path.stat()
+    catalog = Catalog()
+    catalog.record("foo", stat, {"name": "foo"})
+
+    # Rewritten within the same mtime tick, as can happen on coarse filesystems.
+    write_settings(tmp_path, 'name = "foo"\ntitle = "Foo"\n')
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns))
+    assert not catalog.fresh("foo", path.stat())
+
+
+def test_write_load(tmp_path):
+    path = write_settings(tmp_path)
+    catalog = Catalog()
+    catalog.record("foo", path.stat(), {"name": "foo"})
+    assert catalog.stale
+
+    catalog.write(tmp_path / ".catalog.json")
+    assert not catalog.stale
+
+    loaded = Catalog.load(tmp_path / ".catalog.json")
+    assert loaded.get("foo", path.stat()) == {"name": "foo"}
+
+
+def test_load_discards_other_versions(tmp_path):
+    (tmp_path / ".catalog.json").write_text('{"version": 1, "entries": {}}')
+
+    catalog = Catalog.load(tmp_path / ".catalog.json")
+    assert catalog.entries == {}
+    assert catalog.stale
+
+
+def test_load_discards_unreadable(tmp_path):
+    (tmp_path / ".catalog.json").write_text("{")
+
+    catalog = Catalog.load(tmp_path / ".catalog.json")
+    assert catalog.entries == {}
+    assert catalog.stale
+
+
+def test_store_reloads_changed_prints(tmp_path):
+    print = Print(name="foo", title="Foo")
+    print.path = tmp_path / "foo"
+    print.write()
+
+    store = PrintStore.collect(tmp_path)
+    assert store["foo"].title == "Foo"
+    store.preload()
+
+    store = PrintStore.collect(tmp_path)
+    assert store.catalog.fresh("foo", (tmp_path / "foo/project.toml").stat())
+
+    print.title = "Foo Bar"
+    print.write()
+
+    store = PrintStore.collect(tmp_path)
+    assert store["foo"].title == "Foo Bar"
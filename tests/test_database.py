@@ -0,0 +1,114 @@
+import shutil
+
+import pytest
+
+from printed.database import SqlPrintStore
+from printed.schema import Print, PrintHistory, PrintMaterial, PrintStore, State
+from tests.cli import create_cli_fixture
+
+cli = create_cli_fixture()
+
+
+def make_print(number: int) -> Print:
+    return Print(
+        name=f"print-{number}",
+        # Repeated titles and counts, so that ties are broken by name.
+        title=f"Print {number % 3}",
+        reference_cost=number * 2.0,
+        materials=[
+            PrintMaterial(material="PLA", unit_count=number, price_per_unit=0.02)
+        ],
+        history=[PrintHistory() for _ in range(number % 4)],
+    )
+
+
+@pytest.fixture
+def store(tmp_path) -> SqlPrintStore:
+    store = SqlPrintStore.collect(tmp_path)
+    names = [store.add(make_print(number)).name for number in range(10)]
+    store.write(*names)
+    return store
+
+
+def test_write_leaves_print_tree_alone(tmp_path, store):
+    assert [path.name for path in tmp_path.iterdir()] == ["printed.sqlite"]
+
+
+@pytest.mark.parametrize("direction", ["asc", "desc"])
+@pytest.mark.parametrize("order", ["created_at", "count", "name", "saved"])
+@pytest.mark.parametrize("filter", ["all", "printed", "unprinted"])
+def test_select_matches_toml_store(tmp_path, store, order, direction, filter):
+    (tmp_path / "toml").mkdir()
+    toml = PrintStore.collect(tmp_path / "toml")
+    for number in range(10):
+        print = make_print(number)
+        print.created_at = store[print.name].created_at
+        toml.add(print)
+    toml.write(*toml.names())
+
+    for offset, limit in [(0, None), (0, 4), (4, 4), (8, 4)]:
+        expected = [
+            s.name for s in toml.select(order, direction, filter, offset, limit)
+        ]
+        selected = store.select(order, direction, filter, offset, limit)
+        assert [s.name for s in selected] == expected
+
+
+def test_select_filters(store):
+    printed = {s.name for s in store.select("name", "asc", "printed")}
+    unprinted = {s.name for s in store.select("name", "asc", "unprinted")}
+    assert printed == {f"print-{n}" for n in range(10) if n % 4}
+    assert unprinted == {"print-0", "print-4", "print-8"}
+
+
+def test_totals(tmp_path, store):
+    prints = [make_print(number) for number in range(10)]
+    assert store.totals.count == sum(p.count for p in prints)
+    assert store.totals.saved == pytest.approx(sum(p.total_saved for p in prints))
+
+    with store.lock("print-1"):
+        store["print-1"].append_history()
+        store.write("print-1")
+    assert store.totals.count == sum(p.count for p in prints) + 1
+
+    # Totals are queried from the database, so another store agrees.
+    assert SqlPrintStore.collect(tmp_path).totals == store.totals
+
+
+def test_write_rejects_stale_change(tmp_path, store):
+    other = SqlPrintStore.collect(tmp_path)
+
+    store["print-1"].reference_cost = 1.0
+    other["print-1"].reference_cost = 2.0
+
+    # Both are based upon the same revision, so only the first is written.
+    other.write("print-1")
+    store.write("print-1")
+
+    assert store.rejected == ["print-1"]
+    assert other.rejected == []
+    assert SqlPrintStore.collect(tmp_path)["print-1"].reference_cost == 2.0
+    assert store["print-1"].reference_cost == 2.0
+
+
+def test_import_export_round_trip(tmp_path, cli):
+    originals = {}
+    for number in range(5):
+        print = make_print(number)
+        print.path = tmp_path / print.name
+        print.write()
+        originals[print.name] = print.dump()
+
+    cli.invoke("-p", str(tmp_path), "storage", "import")
+    imported = State.collect(tmp_path, backend="sqlite").prints
+    assert sorted(imported.names()) == sorted(originals)
+
+    for name in originals:
+        shutil.rmtree(tmp_path / name)
+
+    cli.invoke("-p", str(tmp_path), "storage", "export")
+    for name, original in originals.items():
+        exported = Print.collect(tmp_path, name).dump()
+        # Each copy is a write, which advances the revision.
+        assert exported.pop("revision") > original.pop("revision")
+        assert exported == original
@@ -0,0 +1,59 @@
+import pytest
+
+from printed.index import OrderIndex
+
+
+@pytest.fixture
+def index() -> OrderIndex:
+    index = OrderIndex()
+    for key, name in enumerate("cadeb"):
+        index.insert(name, key)
+    return index
+
+
+def test_insert_sorts_by_key(index: OrderIndex):
+    assert index.slice("asc") == ["c", "a", "d", "e", "b"]
+    assert index.slice("desc") == ["b", "e", "d", "a", "c"]
+
+
+def test_insert_moves_existing(index: OrderIndex):
+    index.insert("b", -1)
+
+    assert len(index) == 5
+    assert index.slice("asc") == ["b", "c", "a", "d", "e"]
+
+
+def test_ties_broken_by_name():
+    index = OrderIndex()
+    for name in "cab":
+        index.insert(name, 0)
+
+    assert index.slice("asc") == ["a", "b", "c"]
+    assert index.slice("desc") == ["c", "b", "a"]
+
+
+def test_remove(index: OrderIndex):
+    index.remove("d")
+    index.remove("missing")
+
+    assert "d" not in index
+    assert index.slice("asc") == ["c", "a", "e", "b"]
+
+
+@pytest.mark.parametrize(
+    ("direction", "offset", "limit", "expected"),
+    [
+        ("asc", 0, 2, ["c", "a"]),
+        ("asc", 2, 2, ["d", "e"]),
+        ("asc", 4, 2, ["b"]),
+        ("asc", 5, 2, []),
+        ("asc", 3, None, ["e", "b"]),
+        ("desc", 0, 2, ["b", "e"]),
+        ("desc", 2, 2, ["d", "a"]),
+        ("desc", 4, 2, ["c"]),
+        ("desc", 9, 2, []),
+        ("desc", 3, None, ["a", "c"]),
+    ],
+)
+def test_slice(index: OrderIndex, direction, offset, limit, expected):
+    assert index.slice(direction, offset, limit) == expected
@@ -0,0 +1,97 @@
+import io
+import struct
+import zlib
+
+import numpy as np
+import pytest
+import trimesh
+
+from printed.mesh import cluster_vertices, decimate, encode_png, rasterize, to_glb
+
+
+@pytest.fixture(scope="module")
+def sphere() -> trimesh.Trimesh:
+    # 20480 faces.
+    return trimesh.creation.icosphere(subdivisions=5, radius=10)
+
+
+def decode_png(content: bytes) -> np.ndarray:
+    """Decode the (unfiltered, RGBA) PNGs which `encode_png` writes."""
+    assert content[:8] == b"\x89PNG\r\n\x1a\n"
+
+    chunks = {}
+    position = 8
+    while position < len(content):
+        (length,) = struct.unpack(">I", content[position : position + 4])
+        kind = content[position + 4 : position + 8]
+        data = content[position + 8 : position + 8 + length]
+        (crc,) = struct.unpack(
+            ">I", content[position + 8 + length : position + 12 + length]
+        )
+        assert crc == zlib.crc32(kind + data)
+        chunks[kind] = data
+        position += 12 + length
+
+    width, height, depth, color_type, *_ = struct.unpack(">IIBBBBB", chunks[b"IHDR"])
+    assert (depth, color_type) == (8, 6)
+    assert b"IEND" in chunks
+
+    scanlines = np.frombuffer(zlib.decompress(chunks[b"IDAT"]), dtype=np.uint8)
+    scanlines = scanlines.reshape(height, width * 4 + 1)
+    assert not scanlines[:, 0].any()
+    return scanlines[:, 1:].reshape(height, width, 4)
+
+
+def test_cluster_vertices_merges_cells():
+    vertices = np.array(
+        [[0.0, 0.0, 0.0], [0.1, 0.0, 0.0], [10.0, 0.0, 0.0], [0.0, 10.0, 0.0]]
+    )
+    faces = np.array([[0, 1, 2], [0, 2, 3], [1, 2, 3]])
+
+    clustered, remapped = cluster_vertices(vertices, faces, resolution=4)
+
+    # The first two vertices share a cell, which collapses the first face, and
+    # makes the other two duplicates.
+    assert len(clustered) == 3
+    assert clustered[0].tolist() == pytest.approx([0.05, 0.0, 0.0])
+    assert len(remapped) == 1
+
+
+@pytest.mark.parametrize("triangles", [200, 1000, 5000])
+def test_decimate_respects_budget(sphere, triangles):
+    vertices, faces = decimate(sphere.vertices, sphere.faces, triangles)
+
+    assert 0 < len(faces) <= triangles
+    assert faces.max() < len(vertices)
+    # Still roughly the same shape.
+    radii = np.linalg.norm(vertices, axis=1)
+    assert radii.min() > 8 and radii.max() < 10.5
+
+
+def test_decimate_keeps_small_meshes(sphere):
+    vertices, faces = decimate(sphere.vertices, sphere.faces, len(sphere.faces))
+    assert vertices is sphere.vertices
+    assert faces is sphere.faces
+
+
+def test_to_glb(sphere):
+    content = to_glb(*decimate(sphere.vertices, sphere.faces, 1000))
+
+    magic, version, length = struct.unpack("<4sII", content[:12])
+    assert (magic, version, length) == (b"glTF", 2, len(content))
+
+    loaded = trimesh.load(io.BytesIO(content), file_type="glb", force="mesh")
+    assert 0 < len(loaded.faces) <= 1000
+
+
+@pytest.mark.parametrize("size", [16, 64])
+def test_encode_png(sphere, size):
+    image = rasterize(sphere.vertices, sphere.faces, size)
+    decoded = decode_png(encode_png(image))
+
+    assert decoded.shape == (size, size, 4)
+    assert (decoded == image).all()
+
+    # The sphere is centered, and fills the image but for its corners.
+    assert decoded[size // 2, size // 2, 3] == 255
+    assert decoded[0, 0, 3] == 0
@@ -0,0 +1,82 @@
+import os
+
+import pytest
+
+from printed.path import atomic_write
+from printed.schema import Link, Print
+
+
+@pytest.mark.parametrize("fsync", ["none", "file", "full"])
+def test_atomic_write(tmp_path, fsync):
+    path = tmp_path / "file"
+    path.write_bytes(b"before")
+
+    atomic_write(path, b"after", fsync=fsync)
+    assert path.read_bytes() == b"after"
+    assert os.listdir(tmp_path) == ["file"]
+
+
+@pytest.mark.parametrize("fail", ["fsync", "replace"])
+def test_failed_atomic_write_keeps_original(tmp_path, monkeypatch, fail):
+    path = tmp_path / "file"
+    path.write_bytes(b"before")
+
+    def error(*args):
+        raise OSError("No space left on device")
+
+    monkeypatch.setattr(os, fail, error)
+    with pytest.raises(OSError):
+        atomic_write(path, b"after", fsync="file")
+
+    assert path.read_bytes() == b"before"
+    assert os.listdir(tmp_path) == ["file"]
+
+
+def test_write_preserves_comments_and_order(tmp_path):
+    print = Print(
+        name="foo",
+        title="Foo",
+        reference_cost=12.5,
+        source_links=[Link(url="https://example.com/foo", title="Example")],
+    )
+    print.path = tmp_path / "foo"
+    print.write()
+
+    # Annotated and rearranged by hand.
+    settings = tmp_path / "foo" / "project.toml"
+    content = settings.read_text()
+    assert content.startswith('name = "foo"\ntitle = "Foo"\n')
+    content = content.replace(
+        'name = "foo"\ntitle = "Foo"\n',
+        '# Printed for the garage shelves.\ntitle = "Foo"\nname = "foo"\n',
+    )
+    content = content.replace(
+        "reference_cost = 12.5\n", "reference_cost = 12.5  # From the hardware store\n"
+    )
+    content = content.replace("[[source_links]]", "# Links\n[[source_links]]")
+    settings.write_text(content)
+
+    print = Print.collect(tmp_path, "foo")
+    print.reference_cost = 15.0
+    print.source_links[0].title = "Examples"
+    print.write()
+
+    assert settings.read_text() == (
+        content.replace("12.5", "15.0").replace('"Example"', '"Examples"')
+    )
+    assert Print.collect(tmp_path, "foo") == print
+
+
+def test_write_keeps_comments_when_adding_keys(tmp_path):
+    (tmp_path / "foo").mkdir()
+    settings = tmp_path / "foo" / "project.toml"
+    settings.write_text(
+        '# Hand written.\nname = "foo"  # The directory\ntitle = "Foo"\n'
+    )
+
+    print = Print.collect(tmp_path, "foo")
+    print.write()
+
+    content = settings.read_text()
+    assert content.startswith('# Hand written.\nname = "foo"  # The directory\n')
+    assert Print.collect(tmp_path, "foo") == print
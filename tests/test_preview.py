@@ -0,0 +1,98 @@
+import asyncio
+import os
+import time
+from pathlib import Path
+
+import pytest
+
+from printed.preview import PreviewCache, PreviewQueue
+
+pytestmark = pytest.mark.usefixtures("ticking")
+
+
+def render(path: Path) -> bytes:
+    if path.name == "crash.stl":
+        os._exit(1)
+    if path.name == "slow.stl":
+        time.sleep(30)
+    return path.read_bytes()
+
+
+async def wait_for_jobs(queue: PreviewQueue):
+    while queue.jobs:
+        await asyncio.gather(*queue.jobs.values(), return_exceptions=True)
+
+
+@pytest.fixture
+def files(tmp_path) -> dict[str, Path]:
+    files = {}
+    for name in ("model", "crash", "slow"):
+        files[name] = tmp_path / f"{name}.stl"
+        files[name].write_bytes(name.encode())
+    return files
+
+
+def test_preview_is_rendered(tmp_path, files):
+    async def run():
+        queue = PreviewQueue(PreviewCache(tmp_path / "cache"), render=render, workers=1)
+        queue.start()
+        try:
+            assert await queue.submit(files["model"]) == "pending"
+            assert await queue.submit(files["model"]) == "pending"
+            assert len(queue.jobs) == 1
+
+            await wait_for_jobs(queue)
+            assert await queue.submit(files["model"]) == "ready"
+        finally:
+            queue.shutdown()
+
+        path = queue.cache.get(queue.cache.key(files["model"]))
+        assert path is not None and path.read_bytes() == b"model"
+
+    asyncio.run(run())
+
+
+def test_broken_pool_is_replaced(tmp_path, files):
+    async def run():
+        queue = PreviewQueue(PreviewCache(tmp_path / "cache"), render=render, workers=1)
+        queue.start()
+        try:
+            executor = queue.executor
+            await queue.submit(files["crash"])
+            await wait_for_jobs(queue)
+
+            # Interrupted, rather than failed, so retried on demand.
+            assert queue.executor is not executor
+            assert not queue.failed
+
+            await queue.submit(files["model"])
+            await wait_for_jobs(queue)
+            assert await queue.submit(files["model"]) == "ready"
+        finally:
+            queue.shutdown()
+
+    asyncio.run(run())
+
+
+def test_timed_out_job_fails(tmp_path, files):
+    async def run():
+        queue = PreviewQueue(
+            PreviewCache(tmp_path / "cache"), render=render, workers=1, timeout=0.5
+        )
+        queue.start()
+        try:
+            executor = queue.executor
+            await queue.submit(files["slow"])
+            await wait_for_jobs(queue)
+
+            assert queue.executor is not executor
+            assert await queue.submit(files["slow"]) == "failed"
+
+            # The new pool is not held up by the old one's job.
+            await queue.submit(files["model"])
+            await wait_for_jobs(queue)
+            assert await queue.submit(files["model"]) == "ready"
+        finally:
+            queue.shutdown()
+
+    asyncio.run(run())
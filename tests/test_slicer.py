@@ -0,0 +1,93 @@
+import pytest
+from whenever import TimeDelta
+
+from printed.slicer import SlicerMetadata, parse_duration
+
+MOVES = b"G1 X10 Y10 E0.5\n" * 100
+
+PRUSA_TRAILER = b"""
+; filament used [mm] = 1234.5
+; filament used [g] = 12.34, 1.5
+; total filament used [g] = 13.84
+; estimated printing time (normal mode) = 1h 2m 3s
+; filament_type = PETG;PLA
+"""
+
+CURA_HEADER = b""";FLAVOR:Marlin
+;TIME:5025
+;Filament used: 1.2m
+"""
+
+BAMBU_HEADER = b"""; HEADER_BLOCK_START
+; model printing time: 2h 5m 1s; total estimated time: 2h 11m 40s
+; total filament weight [g] : 21.07
+; filament_settings_id = "Bambu PLA Basic @BBL X1C"
+; HEADER_BLOCK_END
+"""
+
+
+def test_parse_prusa_trailer():
+    metadata = SlicerMetadata.parse(MOVES, MOVES + PRUSA_TRAILER)
+
+    assert metadata.duration == TimeDelta(hours=1, minutes=2, seconds=3)
+    assert metadata.grams == pytest.approx(13.84)
+    assert metadata.material == "PETG"
+
+
+def test_parse_cura_header():
+    metadata = SlicerMetadata.parse(CURA_HEADER + MOVES, MOVES)
+
+    assert metadata.duration == TimeDelta(seconds=5025)
+    assert metadata.grams is None
+    assert metadata.material is None
+
+
+def test_parse_bambu_header():
+    metadata = SlicerMetadata.parse(BAMBU_HEADER + MOVES, MOVES)
+
+    assert metadata.duration == TimeDelta(hours=2, minutes=11, seconds=40)
+    assert metadata.grams == pytest.approx(21.07)
+    assert metadata.material == "Bambu PLA Basic @BBL X1C"
+
+
+def test_parse_prefers_trailer():
+    metadata = SlicerMetadata.parse(CURA_HEADER, PRUSA_TRAILER)
+    assert metadata.duration == TimeDelta(hours=1, minutes=2, seconds=3)
+
+
+def test_parse_nothing():
+    assert SlicerMetadata.parse(MOVES, MOVES) == SlicerMetadata()
+
+
+def test_read_gcode(tmp_path):
+    path = tmp_path / "benchy.gcode"
+    path.write_bytes(CURA_HEADER + MOVES + PRUSA_TRAILER)
+
+    metadata = SlicerMetadata.read(path)
+    assert metadata.duration == TimeDelta(hours=1, minutes=2, seconds=3)
+    assert metadata.grams == pytest.approx(13.84)
+
+
+def test_read_empty(tmp_path):
+    path = tmp_path / "empty.gcode"
+    path.write_bytes(b"")
+
+    assert SlicerMetadata.read(path) == SlicerMetadata()
+
+
+@pytest.mark.parametrize(
+    ("value", "expected"),
+    [
+        ("3600", TimeDelta(hours=1)),
+        ("1h 2m 3s", TimeDelta(hours=1, minutes=2, seconds=3)),
+        ("1d 2h", TimeDelta(hours=26)),
+        ("2 hours 5 minutes", TimeDelta(hours=2, minutes=5)),
+        ("1 hour 1 min 30 secs", TimeDelta(hours=1, minutes=1, seconds=30)),
+        ("1.5h", TimeDelta(minutes=90)),
+        (" 45s ", TimeDelta(seconds=45)),
+        ("", None),
+        ("soon", None),
+    ],
+)
+def test_parse_duration(value: str, expected: TimeDelta | None):
+    assert parse_duration(value) == expected
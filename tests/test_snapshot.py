@@ -0,0 +1,97 @@
+import itertools
+
+import pytest
+
+from printed.schema import Print, PrintHistory, PrintMaterial, State
+from printed.snapshot import (
+    SnapshotPrintStore,
+    SnapshotWriter,
+    shared_generation,
+    sync,
+)
+
+
+@pytest.fixture
+def state(tmp_path) -> State:
+    for number in range(12):
+        print = Print(
+            name=f"print-{number}",
+            # Repeated titles and counts, so that ties are broken by name.
+            title=f"Print {number % 4}",
+            reference_cost=number * 1.5,
+            materials=[
+                PrintMaterial(material="PLA", unit_count=number, price_per_unit=0.02)
+            ],
+            history=[PrintHistory() for _ in range(number % 3)],
+        )
+        print.path = tmp_path / print.name
+        print.write()
+
+    state = State.collect_all(tmp_path)
+    state.prints.preload()
+    return state
+
+
+def worker(state: State) -> State:
+    worker = State(path=state.path, prints=SnapshotPrintStore.collect(state.path))
+    sync(worker)
+    return worker
+
+
+@pytest.fixture
+def writer(state: State) -> SnapshotWriter:
+    writer = SnapshotWriter(SnapshotPrintStore.snapshot_path(state.path))
+    writer.publish(state)
+    return writer
+
+
+@pytest.mark.parametrize(
+    ("order", "direction", "filter"),
+    itertools.product(
+        ["created_at", "count", "name", "saved"],
+        ["asc", "desc"],
+        ["all", "printed", "unprinted"],
+    ),
+)
+def test_select_matches_store(state: State, writer, order, direction, filter):
+    snapshot = worker(state)
+
+    for offset, limit in [(0, None), (0, 5), (5, 5), (10, 5)]:
+        expected = state.get_prints(order, direction, filter, offset, limit)
+        assert snapshot.get_prints(order, direction, filter, offset, limit) == expected
+
+
+def test_totals_match_store(state: State, writer):
+    assert worker(state).prints.totals == state.prints.totals
+
+
+def test_sync_picks_up_changes(state: State, writer):
+    snapshot = worker(state)
+    assert snapshot.prints.summarize("print-1").title == "Print 1"
+
+    with state.prints.lock("print-1"):
+        state.prints["print-1"].title = "Renamed"
+        state.prints.write("print-1")
+    writer.publish(state, ["print-1"])
+
+    sync(snapshot)
+    assert snapshot.prints.summarize("print-1").title == "Renamed"
+    assert snapshot.get_prints("name", "desc", "all", 0, 1)[0].name == "print-1"
+
+
+def test_shared_generation(state: State, writer):
+    first, second = worker(state), worker(state)
+    assert shared_generation(first) is not None
+    assert shared_generation(first) == shared_generation(second)
+
+    writer.publish(state)
+    sync(first)
+    assert shared_generation(first) != shared_generation(second)
+    sync(second)
+    assert shared_generation(first) == shared_generation(second)
+
+    # Until the loader publishes a worker's own change, it is the worker's alone.
+    with first.prints.lock("print-2"):
+        first.prints["print-2"].reference_cost = 100.0
+        first.prints.write("print-2")
+    assert shared_generation(first) is None
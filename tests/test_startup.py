@@ -0,0 +1,66 @@
+import os
+import subprocess
+import sys
+
+import pytest
+
+# Only some commands need these, so `printed --help` must never import them.
+DEFERRED = [
+    "printed.schema",
+    "printed.path",
+    "pydantic",
+    "tomlkit",
+    "dotenv",
+    "sqlalchemy",
+    "alembic",
+    "fastapi",
+    "trimesh",
+    "numpy",
+]
+
+# Wall clock time varies too much between machines (CI runners especially) for
+# a tight default; `make startup` checks against a stricter one.
+BUDGET_MS = float(os.environ.get("STARTUP_BUDGET_MS", 1000))
+
+
+def import_times(*args: str) -> tuple[float, set[str]]:
+    """Return the total import time (in ms), and the names of the imported modules."""
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-m", "printed", *args],  # noqa: S603
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+
+    total = 0
+    modules = set()
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+
+        _, cumulative, name = line.split("|")
+        modules.add(name.strip())
+
+        # Only top level imports are summed, since theirs include nested imports.
+        if len(name) - len(name.lstrip()) == 1:
+            total += int(cumulative)
+
+    return total / 1000, modules
+
+
+@pytest.fixture(scope="module")
+def help_imports() -> tuple[float, set[str]]:
+    # The fastest run is the least disturbed by whatever else the machine is doing.
+    runs = [import_times("--help") for _ in range(3)]
+    return min(total for total, _ in runs), runs[0][1]
+
+
+@pytest.mark.parametrize("module", DEFERRED)
+def test_help_defers_import(help_imports, module: str):
+    _, modules = help_imports
+    assert module not in modules
+
+
+def test_help_import_time(help_imports):
+    total, _ = help_imports
+    assert total <= BUDGET_MS
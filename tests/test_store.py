@@ -0,0 +1,241 @@
+import os
+import shutil
+
+import pytest
+from whenever import TimeDelta
+
+from printed.schema import (
+    Print,
+    PrintMaterial,
+    PrintStore,
+    StalePrintError,
+    State,
+    Totals,
+)
+
+
+def add_print(root, name: str, title: str = "") -> Print:
+    print = Print(name=name, title=title or name.title())
+    print.path = root / name
+    print.write()
+    return print
+
+
+def test_reload_records_unloadable_prints(tmp_path):
+    add_print(tmp_path, "foo")
+    state = State.collect_all(tmp_path)
+    assert state.prints.totals.count == 0
+    assert [s.name for s in state.get_prints("name", "asc", "all")] == ["foo"]
+
+    # A print directory is created before its settings file.
+    (tmp_path / "bar").mkdir()
+    assert state.reload([tmp_path / "bar"]) == {"bar"}
+    assert "bar" in state.prints.errors
+    assert [s.name for s in state.get_prints("name", "asc", "all")] == ["foo"]
+
+    add_print(tmp_path, "bar")
+    state.reload([tmp_path / "bar" / "project.toml"])
+    assert "bar" not in state.prints.errors
+    assert [s.name for s in state.get_prints("name", "asc", "all")] == ["bar", "foo"]
+
+    (tmp_path / "bar" / "project.toml").write_text("[[")
+    state.reload([tmp_path / "bar" / "project.toml"])
+    assert "bar" in state.prints.errors
+    assert [s.name for s in state.get_prints("name", "asc", "all")] == ["foo"]
+
+
+def test_write_rejects_stale_revision(tmp_path):
+    print = add_print(tmp_path, "foo")
+
+    with pytest.raises(StalePrintError):
+        print.write(expected=print.revision + 1)
+
+
+def test_flush_discards_stale_change(tmp_path):
+    add_print(tmp_path, "foo")
+    store = PrintStore.collect(tmp_path)
+    other = PrintStore.collect(tmp_path)
+
+    store["foo"].reference_cost = 1.0
+    other["foo"].reference_cost = 2.0
+
+    # Both are based upon the same revision, so only the first is written.
+    other.write("foo")
+    store.write("foo")
+
+    assert store.rejected == ["foo"]
+    assert other.rejected == []
+    assert Print.collect(tmp_path, "foo").reference_cost == 2.0
+    assert store["foo"].reference_cost == 2.0
+
+
+def test_edit_version_changes_with_every_write(tmp_path):
+    add_print(tmp_path, "foo")
+    store = PrintStore.collect(tmp_path)
+    store.write_delay = 60
+
+    print = store["foo"]
+    versions = {store.edit_version(print)}
+    for cost in (1.0, 2.0):
+        with store.lock("foo"):
+            print.reference_cost = cost
+            store.write("foo")
+        versions.add(store.edit_version(print))
+
+    # Both writes are flushed as a single revision.
+    assert len(versions) == 3
+    store.flush()
+    assert Print.collect(tmp_path, "foo").revision == 1
+
+
+def test_edit_version_is_shared_between_stores(tmp_path):
+    add_print(tmp_path, "foo")
+    store = PrintStore.collect(tmp_path)
+    other = PrintStore.collect(tmp_path)
+    assert store.edit_version(store["foo"]) == other.edit_version(other["foo"])
+
+    with store.lock("foo"):
+        store["foo"].append_history()
+        store.write("foo")
+    assert store.edit_version(store["foo"]) != other.edit_version(other["foo"])
+
+    # Once the other store reloads the print, it agrees again, as does a new one.
+    other.reload("foo")
+    version = store.edit_version(store["foo"])
+    assert other.edit_version(other["foo"]) == version
+    assert (
+        PrintStore.collect(tmp_path).edit_version(Print.collect(tmp_path, "foo"))
+        == version
+    )
+
+
+def no_space(*args):
+    raise OSError("No space left on device")
+
+
+def test_writes_within_delay_are_coalesced(tmp_path, monkeypatch):
+    add_print(tmp_path, "foo")
+    add_print(tmp_path, "bar")
+    store = PrintStore.collect(tmp_path)
+    store.write_delay = 60
+
+    writes = []
+    write = Print.write
+
+    def record_write(print: Print, *args, **kwargs):
+        writes.append(print.name)
+        write(print, *args, **kwargs)
+
+    monkeypatch.setattr(Print, "write", record_write)
+
+    for cost in (1.0, 2.0, 3.0):
+        with store.lock("foo"):
+            store["foo"].reference_cost = cost
+            store.write("foo")
+    with store.lock("bar"):
+        store["bar"].reference_cost = 4.0
+        store.write("bar")
+
+    # Nothing is written until the delay is up, or the store is flushed.
+    assert writes == []
+    assert store.pending == {"foo", "bar"}
+    assert Print.collect(tmp_path, "foo").reference_cost == 0.0
+
+    store.flush()
+    assert sorted(writes) == ["bar", "foo"]
+    assert store.pending == set()
+    assert store.flush_timer is None
+
+    foo = Print.collect(tmp_path, "foo")
+    assert (foo.reference_cost, foo.revision) == (3.0, 1)
+    assert Print.collect(tmp_path, "bar").reference_cost == 4.0
+
+
+def test_failed_flush_keeps_print_pending(tmp_path, monkeypatch):
+    add_print(tmp_path, "foo")
+    store = PrintStore.collect(tmp_path)
+    store.write_delay = 60
+
+    with store.lock("foo"):
+        store["foo"].reference_cost = 1.0
+        store.write("foo")
+
+    with monkeypatch.context() as patch:
+        patch.setattr(os, "replace", no_space)
+        store.flush()
+
+    assert store.pending == {"foo"}
+    assert Print.collect(tmp_path, "foo").reference_cost == 0.0
+    assert not any(p.name.endswith(".tmp") for p in (tmp_path / "foo").iterdir())
+
+    # Retried by the next flush.
+    store.flush()
+    assert store.pending == set()
+    assert Print.collect(tmp_path, "foo").reference_cost == 1.0
+
+
+def test_evict_keeps_pending_and_locked_prints(tmp_path):
+    for number in range(6):
+        add_print(tmp_path, f"p{number}")
+    store = PrintStore.collect(tmp_path)
+    store.max_prints = 4
+    store.write_delay = 60
+
+    with store.lock("p0"):
+        store["p0"].reference_cost = 1.0
+        store.write("p0")
+
+    with store.lock("p1"):
+        store["p1"]
+        store["p2"]
+        store["p3"]
+        store["p2"]
+
+        # p0 is pending and p1 is locked, so the least recently used of the
+        # others goes first.
+        store["p4"]
+        assert list(store.prints) == ["p0", "p1", "p2", "p4"]
+        store["p5"]
+        assert list(store.prints) == ["p0", "p1", "p4", "p5"]
+
+    # Once written and unlocked, they are evicted like any other.
+    store.flush()
+    store["p2"]
+    store["p3"]
+    assert list(store.prints) == ["p4", "p5", "p2", "p3"]
+    assert store.evictions == 4
+
+
+def test_incremental_totals_match_recompute(tmp_path):
+    for number in range(4):
+        add_print(tmp_path, f"p{number}")
+    store = PrintStore.collect(tmp_path)
+    store.preload()
+    assert store.totals == Totals()
+
+    # Added, edited and removed, each updating the totals in place.
+    added = Print(
+        name="added",
+        title="Added",
+        reference_cost=5.0,
+        materials=[PrintMaterial(material="PLA", unit_count=20, price_per_unit=0.02)],
+    )
+    store.add(added)
+    store.write("added")
+
+    with store.lock("p1"):
+        print = store["p1"]
+        print.reference_cost = 3.0
+        print.duration = TimeDelta(hours=2)
+        print.append_history()
+        print.append_history()
+        store.write("p1")
+
+    shutil.rmtree(tmp_path / "p2")
+    store.reload("p2")
+
+    assert store.contributions is not None
+    totals = store.totals
+    assert totals == PrintStore.collect(tmp_path).totals
+    assert (totals.count, totals.reference_cost) == (2, 8.0)
+    assert totals.saved == pytest.approx(6.0)
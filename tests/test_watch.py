@@ -0,0 +1,66 @@
+import pytest
+from watchfiles import Change
+
+from printed.path import write_content
+from printed.schema import Print
+from printed.web.main import LibraryFilter, external_changes
+
+
+@pytest.mark.parametrize(
+    ("path", "passed"),
+    [
+        ("foo", True),
+        ("materials.toml", True),
+        ("foo/project.toml", True),
+        ("foo/model.STL", True),
+        ("foo/notes.txt", False),
+        # Hidden files: in-progress writes, locks, the catalog and caches.
+        ("foo/.project.toml.123.456.tmp", False),
+        ("foo/.project.lock", False),
+        (".catalog.json", False),
+        (".cache/previews/abc.glb", False),
+        ("foo/.git/HEAD", False),
+        # Editors' swap and backup files.
+        ("foo/project.toml~", False),
+        ("foo/.project.toml.swp", False),
+    ],
+)
+def test_library_filter(tmp_path, path, passed):
+    watch_filter = LibraryFilter(tmp_path, ["*.toml", " ", "*.stl"])
+    assert watch_filter(Change.modified, str(tmp_path / path)) is passed
+
+
+def test_library_filter_ignores_paths_outside_library(tmp_path):
+    watch_filter = LibraryFilter(tmp_path / "library", ["*.toml"])
+    assert not watch_filter(Change.modified, str(tmp_path / "materials.toml"))
+
+
+def test_external_changes_skip_own_writes(tmp_path):
+    # Two of this process' own writes, and one it never made.
+    print = Print(name="foo", title="Foo")
+    print.path = tmp_path / "foo"
+    print.write()
+    settings = str(tmp_path / "foo" / "project.toml")
+    other = tmp_path / "materials.toml"
+    write_content(other, dict[str, str], {})
+    untracked = tmp_path / "investments.toml"
+    untracked.write_text("")
+
+    changes = {
+        (Change.modified, settings),
+        (Change.added, str(other)),
+        (Change.added, str(untracked)),
+    }
+    assert external_changes(changes) == {(Change.added, str(untracked))}
+
+    # Once another process writes the file, its change is no longer its own.
+    (tmp_path / "foo" / "project.toml").write_text('name = "foo"\ntitle = "Bar"\n')
+    assert external_changes(changes) == {
+        (Change.modified, settings),
+        (Change.added, str(untracked)),
+    }
+
+    # Deletions are never this process' own.
+    other.unlink()
+    deleted = {(Change.deleted, str(other))}
+    assert external_changes(deleted) == deleted
@@ -0,0 +1,52 @@
+from datetime import timedelta
+
+import pytest
+from fastapi.testclient import TestClient
+
+from printed.cli.base import Printed
+from printed.schema import Print, State
+from printed.web.cache import FragmentCache
+from printed.web.main import create_app
+
+
+@pytest.fixture
+def client(tmp_path):
+    print = Print(name="foo", title="Foo")
+    print.path = tmp_path / "foo"
+    print.write()
+
+    # Without the lifespan, so without the watcher and preview queues.
+    app = create_app(Printed(path=tmp_path))
+    app.extra["state"] = State.collect_all(tmp_path)
+    app.extra["fragments"] = FragmentCache(ttl=300)
+    return TestClient(app)
+
+
+def test_unchanged_page_is_not_modified(client):
+    response = client.get("/print/foo")
+    assert response.status_code == 200
+
+    etag = response.headers["ETag"]
+    response = client.get("/print/foo", headers={"If-None-Match": etag})
+    assert response.status_code == 304
+    assert response.headers["ETag"] == etag
+
+
+def test_changed_page_is_rendered(client):
+    etag = client.get("/print/foo").headers["ETag"]
+
+    response = client.post("/print/foo/history", follow_redirects=False)
+    assert response.status_code == 303
+
+    response = client.get("/print/foo", headers={"If-None-Match": etag})
+    assert response.status_code == 200
+    assert response.headers["ETag"] != etag
+
+
+def test_page_is_rendered_once_relative_times_drift(client, time_machine):
+    etag = client.get("/print/foo").headers["ETag"]
+
+    time_machine.shift(timedelta(seconds=300))
+    response = client.get("/print/foo", headers={"If-None-Match": etag})
+    assert response.status_code == 200
+    assert response.headers["ETag"] != etag